@@ -3,13 +3,37 @@ Chronicle Backend API
 FastAPI server handling AI orchestration and character/scene persistence
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Match
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, AsyncIterator, Callable, Iterator, Set, Tuple, TypeVar, Union
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import os
+import sys
 import json
+import re
+import bisect
+import asyncio
+import anyio
+import random
+import secrets
+import itertools
+import hashlib
+import heapq
+import math
+import sqlite3
+import zlib
+import time
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from dataclasses import asdict, dataclass
 from datetime import datetime
 import logging
 
@@ -20,6 +44,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 app = FastAPI(title="Chronicle API", version="1.0.0")
 
 # CORS middleware for frontend
@@ -29,8 +55,234 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
+)
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+# Seconds; spans sub-10ms local work up to slow model calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """One metric family: a value per combination of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def of(cls, name: str, help: str, labels: Tuple[str, ...], series: Dict[Tuple[str, ...], float]) -> "Metric":
+        """Snapshot of counts kept elsewhere, for rendering at scrape time"""
+        metric = cls(name, help, labels)
+        metric._series = dict(series)
+        return metric
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in sorted(series):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts (last is +Inf), sum]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labels, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metrics served by GET /metrics in the Prometheus text format.
+
+    Live metrics are updated in place; collectors turn counters kept by
+    other components (caches, pre-filter, token usage) into metric
+    snapshots when the endpoint is scraped.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], List[Metric]]] = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        self.metrics.append(Counter(name, help, labels))
+        return self.metrics[-1]
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        self.metrics.append(Gauge(name, help, labels))
+        return self.metrics[-1]
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Histogram:
+        self.metrics.append(Histogram(name, help, labels))
+        return self.metrics[-1]
+
+    def collector(self, collect: Callable[[], List[Metric]]) -> Callable[[], List[Metric]]:
+        self.collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        families = list(self.metrics)
+        for collect in self.collectors:
+            families.extend(collect())
+        return "\n".join(line for metric in families for line in metric.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+request_seconds = metrics.histogram(
+    "chronicle_request_duration_seconds",
+    "Time until the response starts (headers sent), per route",
+    ("endpoint", "status")
+)
+requests_in_flight = metrics.gauge("chronicle_requests_in_flight", "Requests being served, per route", ("endpoint",))
+phase_seconds = metrics.histogram(
+    "chronicle_phase_duration_seconds",
+    "Time spent in each traced phase of a request",
+    ("endpoint", "phase")
+)
+llm_call_seconds = metrics.histogram(
+    "chronicle_llm_call_duration_seconds",
+    "Model call latency per orchestration task",
+    ("task", "outcome")
+)
+llm_queue_seconds = metrics.histogram(
+    "chronicle_llm_queue_wait_seconds",
+    "Time waiting in the admission queue (concurrency slot and rate limit)",
+    ("task",)
+)
+llm_in_flight = metrics.gauge("chronicle_llm_calls_in_flight", "Model calls in progress", ("task",))
+llm_retries = metrics.counter("chronicle_llm_retries_total", "Model calls retried after a transient provider error", ("task",))
+edit_verdicts = metrics.counter(
+    "chronicle_edit_verdicts_total",
+    "Edit commands approved or rejected, by who answered",
+    ("source", "verdict")
+)
+job_seconds = metrics.histogram(
+    "chronicle_job_duration_seconds",
+    "Background job run time per attempt",
+    ("kind", "outcome")
+)
+speculative_seconds_saved = metrics.histogram(
+    "chronicle_speculative_seconds_saved",
+    "Latency saved per edit by evolving the scene while it is validated"
 )
 
+# Route template of the request being served ("POST /api/edits"), for per-endpoint accounting
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background")
+
+# Fraction of requests whose phase breakdown is logged
+trace_sample_rate = float(os.environ.get("CHRONICLE_TRACE_SAMPLE_RATE", "0"))
+
+
+class RequestTrace:
+    """Seconds per phase of one request, filled in by span()"""
+
+    __slots__ = ("start", "phases")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items())
+
+    def summary(self) -> str:
+        return ", ".join(f"{phase} {seconds * 1000:.1f}ms" for phase, seconds in self.phases.items())
+
+
+current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("current_trace", default=None)
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Add time to a phase of the current request (summed when a phase runs more than once)"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.phases[phase] = trace.phases.get(phase, 0.0) + seconds
+    phase_seconds.observe(seconds, endpoint=current_endpoint.get(), phase=phase)
+
+
+@contextmanager
+def span(phase: str):
+    """Time the enclosed block as one phase of the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
 # Initialize Google Gemini
 # Get free API key at: https://makersuite.google.com/app/apikey
 api_key = os.environ.get("GOOGLE_API_KEY", "")
@@ -44,48 +296,464 @@ else:
 
 genai.configure(api_key=api_key)
 
-# List available models to find the right one
-logger.info("📋 Listing available Gemini models...")
-try:
-    available_models = []
-    for m in genai.list_models():
-        if 'generateContent' in m.supported_generation_methods:
-            available_models.append(m.name)
-            logger.info(f"  ✓ {m.name}")
-    
+# Model discovery runs lazily on the first Gemini call (never at import time),
+# is cached for the life of the process, and can be cached on disk or skipped
+# entirely by pinning CHRONICLE_GEMINI_MODEL.
+PREFERRED_MODELS = [
+    'models/gemini-1.5-flash-latest',
+    'models/gemini-1.5-flash',
+    'models/gemini-pro',
+    'models/gemini-1.0-pro',
+    'gemini-pro'
+]
+DEFAULT_MODEL = "gemini-pro"
+model_cache_path = os.environ.get("CHRONICLE_MODEL_CACHE", "")
+model_cache_ttl = float(os.environ.get("CHRONICLE_MODEL_CACHE_TTL", "86400"))
+_resolved_model_name: Optional[str] = None
+# After a failed discovery the default model is used, and discovery retried once this much time has passed
+MODEL_DISCOVERY_RETRY_SECONDS = 60.0
+_discovery_retry_at = 0.0
+
+
+def discover_model_name() -> Optional[str]:
+    """List available Gemini models and pick the best preferred one; None if none could be listed"""
+    logger.info("📋 Listing available Gemini models...")
+    try:
+        available_models = []
+        for m in genai.list_models():
+            if 'generateContent' in m.supported_generation_methods:
+                available_models.append(m.name)
+                logger.info(f"  ✓ {m.name}")
+    except Exception as e:
+        logger.error(f"❌ Error listing models: {e}")
+        return None
+
     # Try to use the best available free model
-    model_name = None
-    preferred_models = [
-        'models/gemini-1.5-flash-latest',
-        'models/gemini-1.5-flash',
-        'models/gemini-pro',
-        'models/gemini-1.0-pro',
-        'gemini-pro'
-    ]
-    
-    for preferred in preferred_models:
-        if preferred in available_models or preferred.replace('models/', '') in [m.replace('models/', '') for m in available_models]:
-            model_name = preferred
-            logger.info(f"✅ Using model: {model_name}")
-            break
-    
-    if not model_name and available_models:
-        model_name = available_models[0]
-        logger.info(f"⚠️  Using first available model: {model_name}")
-    elif not model_name:
-        logger.error("❌ No models available! Check your API key.")
-        model_name = "gemini-pro"  # fallback
-    
-    model = genai.GenerativeModel(model_name)
-    
-except Exception as e:
-    logger.error(f"❌ Error listing models: {e}")
-    logger.info("⚠️  Trying default model 'gemini-pro'...")
-    model = genai.GenerativeModel('gemini-pro')
+    short_names = [m.replace('models/', '') for m in available_models]
+    for preferred in PREFERRED_MODELS:
+        if preferred in available_models or preferred.replace('models/', '') in short_names:
+            logger.info(f"✅ Using model: {preferred}")
+            return preferred
+
+    if available_models:
+        logger.info(f"⚠️  Using first available model: {available_models[0]}")
+        return available_models[0]
+
+    logger.error("❌ No models available! Check your API key.")
+    return None
+
+
+def _read_model_cache() -> Optional[str]:
+    try:
+        with open(model_cache_path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached.get("resolvedAt", 0) > model_cache_ttl:
+        return None
+    return cached.get("modelName")
+
+
+def _write_model_cache(name: str) -> None:
+    try:
+        with open(model_cache_path, "w") as f:
+            json.dump({"modelName": name, "resolvedAt": time.time()}, f)
+    except OSError as e:
+        logger.warning(f"⚠️  Could not write model cache {model_cache_path}: {e}")
+
+
+def resolve_model_name() -> str:
+    """Configured model, else cached discovery result, else discover now"""
+    global _resolved_model_name, _discovery_retry_at
+    if _resolved_model_name:
+        return _resolved_model_name
+
+    name = os.environ.get("CHRONICLE_GEMINI_MODEL")
+    if not name and model_cache_path:
+        name = _read_model_cache()
+        if name:
+            logger.info(f"✅ Using cached model: {name}")
+    if not name:
+        name = discover_model_name() if time.time() >= _discovery_retry_at else None
+        if name is None:
+            # A fallback is never cached, in memory or on disk: discovery runs again after a while
+            _discovery_retry_at = max(_discovery_retry_at, time.time() + MODEL_DISCOVERY_RETRY_SECONDS)
+            logger.info(f"⚠️  Trying default model '{DEFAULT_MODEL}'...")
+            return DEFAULT_MODEL
+        if model_cache_path:
+            _write_model_cache(name)
+
+    _resolved_model_name = name
+    return name
+
+# ============================================================================
+# MODEL PROVIDERS
+# ============================================================================
+
+@dataclass
+class ModelResponse:
+    text: str
+    # Provider-reported usage; estimated from the text when a provider reports none
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+class ModelProvider:
+    """Backend the orchestration functions send prompts to.
+
+    `task` names the orchestration step ("scene", "edit", "edit_batch", "evolve" or "recap")
+    so providers that don't call a real model know what shape to answer with.
+    """
+
+    name = "base"
+
+    async def generate(self, prompt: str, task: str) -> ModelResponse:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, task: str) -> AsyncIterator[str]:
+        """Yield the response text in chunks; providers without streaming yield it whole"""
+        response = await self.generate(prompt, task)
+        yield response.text
+
+    def is_transient(self, error: Exception) -> bool:
+        """Whether a failed call is worth retrying"""
+        return False
+
+    def is_quota_error(self, error: Exception) -> bool:
+        """Whether a failed call was refused for exceeding the provider quota"""
+        return False
+
+
+class GeminiProvider(ModelProvider):
+    """Google Gemini through google-generativeai's async API"""
+
+    name = "gemini"
+
+    def __init__(self):
+        self.model = None
+        self._model_lock = asyncio.Lock()
+
+    async def get_model(self):
+        """Build the GenerativeModel on first use; discovery runs off the event loop"""
+        if self.model is None:
+            async with self._model_lock:
+                if self.model is None:
+                    model_name = await asyncio.to_thread(resolve_model_name)
+                    if _resolved_model_name is None:
+                        # Discovery failed: use the default for now, and don't keep it
+                        return genai.GenerativeModel(model_name)
+                    self.model = genai.GenerativeModel(model_name)
+        return self.model
+
+    async def generate(self, prompt: str, task: str) -> ModelResponse:
+        gemini_model = await self.get_model()
+        response = await gemini_model.generate_content_async(prompt)
+        usage = getattr(response, "usage_metadata", None)
+        return ModelResponse(
+            text=response.text,
+            input_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None)
+        )
+
+    async def stream(self, prompt: str, task: str) -> AsyncIterator[str]:
+        gemini_model = await self.get_model()
+        response = await gemini_model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+    def is_transient(self, error: Exception) -> bool:
+        return isinstance(error, (
+            google_exceptions.TooManyRequests,
+            google_exceptions.InternalServerError,
+            google_exceptions.ServiceUnavailable,
+            google_exceptions.DeadlineExceeded
+        ))
+
+    def is_quota_error(self, error: Exception) -> bool:
+        return isinstance(error, google_exceptions.TooManyRequests)
+
+
+class StubProviderError(RuntimeError):
+    """Injected failure from StubProvider"""
+
+
+STUB_RESPONSES = {
+    "scene": json.dumps({
+        "sceneDescription": "The character pauses at the edge of a quiet room, taking in the familiar details.",
+        "visualPrompt": "Character standing in a softly lit room, canonical appearance, calm composition",
+        "emotionalState": "contemplative",
+        "environment": "quiet room in the afternoon",
+        "narrativeSummary": "A calm moment before the story moves on."
+    }),
+    "evolve": json.dumps({
+        "sceneDescription": "The moment shifts as the edit takes hold, and the character reacts in kind.",
+        "visualPrompt": "Same character, canonical appearance, adjusted pose and lighting",
+        "emotionalState": "attentive",
+        "environment": "the same room, a little later",
+        "narrativeSummary": "The scene evolves without breaking canon."
+    }),
+    "edit": json.dumps({
+        "isValid": True,
+        "editType": "emotion_change",
+        "rejectionReason": None,
+        "constraints": [],
+        "changes": {"emotionalState": "attentive", "environment": None, "visualAdjustments": "softer lighting"},
+        "narrativeDelta": "The character's mood shifts."
+    }),
+    "recap": "The character began in quiet reflection. Each scene pushed them a little further. They remain true to who they are."
+}
+
+
+class StubProvider(ModelProvider):
+    """Deterministic offline provider for load testing and profiling.
+
+    latency is a distribution spec: "fixed:S", "uniform:LO,HI",
+    "normal:MEAN,STDDEV" or "lognormal:MU,SIGMA" (seconds). malformed_rate
+    is the fraction of JSON answers returned wrapped in prose and truncated.
+    A seeded RNG drives latency samples, injected errors and malformed
+    answers, so runs are reproducible.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency: str = "fixed:0",
+        error_rate: float = 0.0,
+        seed: int = 0,
+        responses: Optional[Dict[str, str]] = None,
+        malformed_rate: float = 0.0
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.responses = {**STUB_RESPONSES, **(responses or {})}
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.stream_chunks = 8
+        kind, _, params = latency.partition(":")
+        values = [float(v) for v in params.split(",")] if params else [0.0]
+        samplers = {
+            "fixed": lambda: values[0],
+            "uniform": lambda: self.random.uniform(values[0], values[1]),
+            "normal": lambda: self.random.gauss(values[0], values[1]),
+            "lognormal": lambda: self.random.lognormvariate(values[0], values[1]),
+        }
+        if kind not in samplers:
+            raise ValueError(f"Unknown stub latency distribution: {latency}")
+        self._sample_latency = samplers[kind]
+
+    @classmethod
+    def from_env(cls) -> "StubProvider":
+        responses = None
+        responses_path = os.environ.get("CHRONICLE_STUB_RESPONSES")
+        if responses_path:
+            with open(responses_path) as f:
+                responses = json.load(f)
+        return cls(
+            latency=os.environ.get("CHRONICLE_STUB_LATENCY", "fixed:0"),
+            error_rate=float(os.environ.get("CHRONICLE_STUB_ERROR_RATE", "0")),
+            seed=int(os.environ.get("CHRONICLE_STUB_SEED", "0")),
+            responses=responses,
+            malformed_rate=float(os.environ.get("CHRONICLE_STUB_MALFORMED_RATE", "0"))
+        )
+
+    async def generate(self, prompt: str, task: str) -> ModelResponse:
+        self.calls += 1
+        delay = max(0.0, self._sample_latency())
+        failed = self.random.random() < self.error_rate
+        if delay:
+            await asyncio.sleep(delay)
+        if failed:
+            raise StubProviderError(f"Injected stub failure for task '{task}'")
+        return ModelResponse(text=self._answer(prompt, task))
+
+    def _answer(self, prompt: str, task: str) -> str:
+        if task == "edit_batch":
+            # One canned edit analysis per numbered command in the prompt
+            count = len(re.findall(r'^\d+\. "', prompt, flags=re.MULTILINE))
+            text = "[" + ", ".join([self.responses["edit"]] * count) + "]"
+        else:
+            text = self.responses[task]
+        if task != "recap" and self.random.random() < self.malformed_rate:
+            return f"Sure! Here is the JSON:\n```json\n{text[:-1]}\n```"
+        return text
+
+    async def stream(self, prompt: str, task: str) -> AsyncIterator[str]:
+        """Yield the canned response in stream_chunks pieces spread over the sampled latency"""
+        self.calls += 1
+        delay = max(0.0, self._sample_latency())
+        failed = self.random.random() < self.error_rate
+        text = self._answer(prompt, task)
+        size = max(1, -(-len(text) // self.stream_chunks))
+        for start in range(0, len(text), size):
+            if delay:
+                await asyncio.sleep(delay / self.stream_chunks)
+            if failed:
+                raise StubProviderError(f"Injected stub failure for task '{task}'")
+            yield text[start:start + size]
+
+    def is_transient(self, error: Exception) -> bool:
+        return isinstance(error, StubProviderError)
+
+
+if os.environ.get("CHRONICLE_MODEL_PROVIDER", "gemini") == "stub":
+    model_provider: ModelProvider = StubProvider.from_env()
+else:
+    model_provider = GeminiProvider()
+logger.info(f"🔌 Model provider: {model_provider.name}")
+
+# Max number of model calls in flight per worker; the rest wait in the admission queue
+llm_concurrency = int(os.environ.get("CHRONICLE_LLM_CONCURRENCY", "64"))
+
+# Queue order for model calls: interactive edits first, recaps last
+TASK_PRIORITY = {"edit": 0, "edit_batch": 0, "evolve": 0, "scene": 1, "recap": 2}
+
+
+class AdmissionRejected(HTTPException):
+    """Model calls are over capacity; answered as 429 with a Retry-After hint"""
+
+    def __init__(self, retry_after: int, detail: str = "Story engine is busy, retry shortly"):
+        super().__init__(status_code=429, detail=detail, headers={"Retry-After": str(retry_after)})
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Gate in front of every model call.
+
+    At most `concurrency` calls run at once and, with rate > 0, a token
+    bucket (rate calls/s, bursts of `burst`) keeps starts within the
+    provider quota. Calls that can't start wait in a priority queue
+    (TASK_PRIORITY, then arrival order) of at most queue_size entries;
+    beyond that they are rejected immediately with AdmissionRejected.
+    Lower-priority tasks are already turned away once the queue is three
+    quarters full, keeping headroom for interactive edits.
+    """
+
+    def __init__(self, concurrency: int = 64, rate: float = 0.0, burst: float = 10.0, queue_size: int = 1000):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.queue_size = queue_size
+        self.active = 0
+        self.rejected: Dict[str, int] = {}
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._waiting: List[Tuple[int, int, "asyncio.Future[None]"]] = []
+        self.queued = 0
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Smoothed call duration, for Retry-After estimates
+        self._call_seconds = 1.0
+
+    def _take_token(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until a call queued now would likely start"""
+        ahead = self.queued + 1
+        per_second = self.concurrency / self._call_seconds
+        if self.rate > 0:
+            per_second = min(per_second, self.rate)
+        return max(1, math.ceil(ahead / per_second))
+
+    def check(self, task: str) -> None:
+        """Fail fast, before doing any work, when a call for task would be rejected"""
+        limit = self.queue_size if TASK_PRIORITY.get(task, 1) == 0 else self.queue_size * 3 // 4
+        if self.queued >= limit:
+            self.rejected[task] = self.rejected.get(task, 0) + 1
+            raise AdmissionRejected(self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, task: str):
+        """Hold one model-call slot for the duration of the block"""
+        if self.queued or self.active >= self.concurrency or not self._take_token():
+            self.check(task)
+            granted = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiting, (TASK_PRIORITY.get(task, 1), next(self._order), granted))
+            self.queued += 1
+            self._dispatch()
+            try:
+                await granted
+            except asyncio.CancelledError:
+                if granted.done() and not granted.cancelled():
+                    # Granted and cancelled in the same tick: hand the slot on
+                    self._release()
+                else:
+                    self.queued -= 1
+                raise
+        else:
+            self.active += 1
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._call_seconds = 0.9 * self._call_seconds + 0.1 * (time.perf_counter() - started)
+            self._release()
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._dispatch()
 
-# In-memory storage (in production, use PostgreSQL/MongoDB)
-characters_db = {}
-scenes_db = {}
+    def _dispatch(self) -> None:
+        while self._waiting and self.active < self.concurrency:
+            if self._waiting[0][2].cancelled():
+                heapq.heappop(self._waiting)
+                continue
+            if not self._take_token():
+                if self._timer is None:
+                    self._timer = asyncio.get_running_loop().call_later(
+                        (1 - self._tokens) / self.rate, self._on_timer
+                    )
+                return
+            _, _, granted = heapq.heappop(self._waiting)
+            self.queued -= 1
+            self.active += 1
+            granted.set_result(None)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "concurrency": self.concurrency,
+            "ratePerSecond": self.rate,
+            "queueSize": self.queue_size
+        }
+
+
+admission = AdmissionController(
+    concurrency=llm_concurrency,
+    rate=float(os.environ.get("CHRONICLE_LLM_RATE", "0")),
+    burst=float(os.environ.get("CHRONICLE_LLM_BURST", "10")),
+    queue_size=int(os.environ.get("CHRONICLE_LLM_QUEUE_SIZE", "1000"))
+)
+
+# Retries of transient provider errors, with exponential backoff from llm_retry_base seconds
+llm_retry_limit = int(os.environ.get("CHRONICLE_LLM_RETRIES", "3"))
+llm_retry_base = float(os.environ.get("CHRONICLE_LLM_RETRY_BASE", "0.5"))
+
+
+def retry_delay(attempt: int, base: Optional[float] = None) -> float:
+    """Exponential backoff with jitter from base (CHRONICLE_LLM_RETRY_BASE) seconds, capped at 30 seconds"""
+    return min(30.0, (llm_retry_base if base is None else base) * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+# Max evolved scenes generated in parallel for one batch edit request
+batch_parallelism = int(os.environ.get("CHRONICLE_BATCH_PARALLELISM", "4"))
 
 # ============================================================================
 # REQUEST/RESPONSE MODELS
@@ -120,12 +788,33 @@ class Scene(BaseModel):
     edits: List[Dict[str, Any]]
     previousSceneId: Optional[str] = None
     imageUrl: Optional[str] = None
+    # Story branch the scene belongs to and its position in its lineage (1 for a first scene);
+    # assigned by the store when left unset
+    branchId: Optional[str] = None
+    depth: Optional[int] = None
+
+class SceneContent(BaseModel):
+    """Scene fields the model generates"""
+    sceneDescription: str
+    visualPrompt: str
+    emotionalState: str
+    environment: str
+    narrativeSummary: str
 
 class EditRequest(BaseModel):
     characterId: str
     sceneId: str
     command: str
 
+# Commands per /api/edits/batch request: all of them share one prompt, which must fit the token budget
+MAX_BATCH_COMMANDS = 20
+
+class BatchEditRequest(BaseModel):
+    characterId: str
+    sceneId: str
+    commands: List[str] = Field(min_length=1, max_length=MAX_BATCH_COMMANDS)
+    chain: bool = False  # apply each approved edit to the scene produced by the previous one
+
 class EditAnalysis(BaseModel):
     isValid: bool
     editType: str
@@ -135,219 +824,3008 @@ class EditAnalysis(BaseModel):
     narrativeDelta: str
 
 # ============================================================================
-# AI ORCHESTRATION FUNCTIONS
+# SCENE RECORDS
 # ============================================================================
 
-def generate_first_scene(character: Character) -> Scene:
-    """Generate initial scene for a new character using Gemini"""
-    
-    logger.info(f"🤖 Calling Gemini API to generate first scene for character: {character.name}")
-    
-    prompt = f"""You are the Scene Orchestrator for Chronicle, a character story engine.
+@dataclass(slots=True)
+class EditRecord:
+    """One edit that led to a scene"""
+    command: str
+    editType: str
+    timestamp: str
 
-CHARACTER CANON (IMMUTABLE):
-Name: {character.name}
-Appearance: {character.canonicalAppearance}
-Personality: {character.personality}
-Emotional Baseline: {character.emotionalBaseline}
-Immutable Traits: {', '.join(character.immutableTraits)}
+    def __post_init__(self):
+        self.editType = sys.intern(self.editType)
 
-Generate the FIRST SCENE introducing this character. Respond ONLY with valid JSON (no markdown, no code blocks):
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EditRecord":
+        return cls(
+            command=data.get("command", ""),
+            editType=data.get("editType", ""),
+            timestamp=data.get("timestamp", "")
+        )
 
-{{
-  "sceneDescription": "2-3 sentences describing the scene",
-  "visualPrompt": "Detailed image generation prompt maintaining canonical appearance",
-  "emotionalState": "current emotion",
-  "environment": "location description",
-  "narrativeSummary": "what's happening in this moment"
-}}
+    def to_dict(self) -> Dict[str, Any]:
+        return {"command": self.command, "editType": self.editType, "timestamp": self.timestamp}
 
-Be creative but STRICTLY honor the character canon. Output ONLY the JSON object, nothing else."""
 
-    response = model.generate_content(prompt)
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+@dataclass(slots=True)
+class SceneRecord:
+    """Compact internal form of Scene, with the same field names.
+
+    Stores and orchestration work with SceneRecords; the API converts them
+    with to_dict() only when building a response. Strings that repeat across
+    scenes (character and branch ids, emotional states, environments, edit
+    types) are interned so scenes share one copy.
+    """
+    id: str
+    characterId: str
+    sceneNumber: int
+    sceneDescription: str
+    visualPrompt: str
+    emotionalState: str
+    environment: str
+    narrativeSummary: str
+    timestamp: str
+    edits: Tuple[EditRecord, ...] = ()
+    previousSceneId: Optional[str] = None
+    imageUrl: Optional[str] = None
+    branchId: Optional[str] = None
+    depth: Optional[int] = None
+
+    def __post_init__(self):
+        self.characterId = sys.intern(self.characterId)
+        self.emotionalState = sys.intern(self.emotionalState)
+        self.environment = sys.intern(self.environment)
+        self.branchId = _intern(self.branchId)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SceneRecord":
+        return cls(
+            id=data["id"],
+            characterId=data["characterId"],
+            sceneNumber=data["sceneNumber"],
+            sceneDescription=data["sceneDescription"],
+            visualPrompt=data["visualPrompt"],
+            emotionalState=data["emotionalState"],
+            environment=data["environment"],
+            narrativeSummary=data["narrativeSummary"],
+            timestamp=data["timestamp"],
+            edits=tuple(EditRecord.from_dict(edit) for edit in data.get("edits") or ()),
+            previousSceneId=data.get("previousSceneId"),
+            imageUrl=data.get("imageUrl"),
+            branchId=data.get("branchId"),
+            depth=data.get("depth")
+        )
+
+    @classmethod
+    def from_json(cls, text: str) -> "SceneRecord":
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def from_scene(cls, scene: Union[Scene, "SceneRecord"]) -> "SceneRecord":
+        """Accepts either form, so stores can take API models as well as records"""
+        if isinstance(scene, SceneRecord):
+            return scene
+        return cls.from_dict(scene.model_dump())
+
+    def get(self, field: str) -> Any:
+        """JSON-ready value of one field, for projected responses"""
+        if field == "edits":
+            return [edit.to_dict() for edit in self.edits]
+        return getattr(self, field)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "characterId": self.characterId,
+            "sceneNumber": self.sceneNumber,
+            "sceneDescription": self.sceneDescription,
+            "visualPrompt": self.visualPrompt,
+            "emotionalState": self.emotionalState,
+            "environment": self.environment,
+            "narrativeSummary": self.narrativeSummary,
+            "timestamp": self.timestamp,
+            "edits": [edit.to_dict() for edit in self.edits],
+            "previousSceneId": self.previousSceneId,
+            "imageUrl": self.imageUrl,
+            "branchId": self.branchId,
+            "depth": self.depth
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+# ============================================================================
+# ID GENERATION
+# ============================================================================
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+class IdGenerator:
+    """Monotonic, time-sortable, collision-free ids in the ULID layout.
+
+    128 bits: a 48-bit millisecond timestamp, a 32-bit random node drawn per
+    process (and redrawn in forked children), and a 48-bit per-process
+    sequence. next() on an itertools.count is atomic under the GIL, so ids
+    are unique across threads and coroutines without a lock, and the node
+    keeps workers apart. Encoded as 26 Crockford base32 characters.
+    """
+
+    def __init__(self):
+        self._reseed()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reseed)
+
+    def _reseed(self) -> None:
+        self._node = secrets.randbits(32)
+        self._sequence = itertools.count()
+
+    def new_id(self, prefix: str) -> str:
+        value = (
+            (time.time_ns() // 1_000_000) << 80
+            | self._node << 48
+            | (next(self._sequence) & 0xFFFFFFFFFFFF)
+        )
+        encoded = []
+        for _ in range(26):
+            encoded.append(_CROCKFORD[value & 31])
+            value >>= 5
+        return f"{prefix}_{''.join(reversed(encoded))}"
+
+
+id_generator = IdGenerator()
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+@dataclass
+class RecapState:
+    """Rolling memory recap of a character and how much of its story is folded into it"""
+    summary: str
+    # history_version of the character when the recap was written
+    version: str
+    # Highest sceneNumber folded in, and how many scenes that is
+    last_number: int
+    scene_count: int
+
+
+@dataclass
+class Branch:
+    """A run of scenes that each continue the one before.
+
+    Continuing the last scene of a branch extends it; continuing any other
+    scene forks a new branch that only records the scene it forked from,
+    so ancestors are shared rather than copied. Scene i of the branch has
+    depth base_depth + i + 1.
+    """
+    id: str
+    character_id: str
+    fork_scene_id: Optional[str]
+    base_depth: int
+    scene_ids: List[str]
+    # Positions handed out by allocate_branch, stored or not
+    reserved: int = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "branchId": self.id,
+            "forkSceneId": self.fork_scene_id,
+            "baseDepth": self.base_depth,
+            "length": len(self.scene_ids),
+            "tipSceneId": self.scene_ids[-1] if self.scene_ids else self.fork_scene_id
+        }
+
+
+@dataclass
+class Job:
+    """A unit of deferred model work (first scene, recap) and its persisted state.
+
+    status moves queued -> running -> succeeded | failed, going back to
+    queued between retries. A running job holds a lease; once it expires
+    (the worker died) any worker may claim the job again.
+    """
+    id: str
+    kind: str
+    character_id: str
+    status: str = "queued"
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str = ""
+    updated_at: str = ""
+    lease_until: float = 0.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def claim(self, now: float, lease_seconds: float) -> bool:
+        """Move a queued (or abandoned running) job to running; False if someone else has it"""
+        if not (self.status == "queued" or (self.status == "running" and self.lease_until < now)):
+            return False
+        self.status = "running"
+        self.attempts += 1
+        self.lease_until = now + lease_seconds
+        self.updated_at = datetime.now().isoformat()
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "jobId": self.id,
+            "kind": self.kind,
+            "characterId": self.character_id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at
+        }
+
+
+class StoryStore:
+    """In-memory character/scene storage (in production, use PostgreSQL/MongoDB).
+
+    Besides the flat id -> object maps, every character keeps its scene ids
+    ordered by sceneNumber and every scene keeps the ids of the scenes that
+    continue from it (previousSceneId), so per-character reads and deletes
+    cost O(k) in that character's scenes rather than O(total scenes).
+    Scenes are also grouped into branches, so a lineage is a few list
+    slices rather than one dict lookup per ancestor.
+    """
+
+    # Calls only touch process memory, so async code may make them on the event loop
+    blocking = False
+
+    def __init__(self):
+        self.characters: Dict[str, Character] = {}
+        self.scenes: Dict[str, SceneRecord] = {}
+        # characterId -> scene ids / sceneNumbers, kept sorted by sceneNumber
+        self._scene_ids: Dict[str, List[str]] = {}
+        self._scene_numbers: Dict[str, List[int]] = {}
+        # previousSceneId -> ids of scenes that continue from it
+        self._children: Dict[str, List[str]] = {}
+        self._recaps: Dict[str, RecapState] = {}
+        # characterId -> highest sceneNumber handed out by allocate_scene_number
+        self._allocated: Dict[str, int] = {}
+        # Guards every read or write spanning several of these structures: sync endpoints
+        # call in from the threadpool while async ones call on the event loop
+        self._lock = threading.RLock()
+        # characterId -> number of the latest write to its scenes, counted across all characters
+        # so that a deleted and re-created character never repeats a history_version
+        self._versions: Dict[str, int] = {}
+        self._writes = 0
+        self._epoch = secrets.token_hex(4)
+        self._branches: Dict[str, Branch] = {}
+        self._character_branches: Dict[str, List[str]] = {}
+        self._jobs: Dict[str, Job] = {}
+
+    # -- characters ---------------------------------------------------------
+
+    def add_character(self, character: Character) -> None:
+        with self._lock:
+            self.characters[character.id] = character
+            self._scene_ids.setdefault(character.id, [])
+            self._scene_numbers.setdefault(character.id, [])
+
+    def add_characters(self, characters: List[Character]) -> None:
+        with self._lock:
+            for character in characters:
+                self.add_character(character)
+
+    def get_character(self, character_id: str) -> Optional[Character]:
+        return self.characters.get(character_id)
+
+    def character_ids(self) -> List[str]:
+        """Ids of every character, oldest first"""
+        with self._lock:
+            return list(self.characters)
+
+    def has_character(self, character_id: str) -> bool:
+        return character_id in self.characters
+
+    def delete_character(self, character_id: str) -> int:
+        """Delete a character and its scenes, returning the number of scenes removed"""
+        with self._lock:
+            del self.characters[character_id]
+            self._recaps.pop(character_id, None)
+            self._allocated.pop(character_id, None)
+            self._versions.pop(character_id, None)
+            for branch_id in self._character_branches.pop(character_id, []):
+                del self._branches[branch_id]
+            scene_ids = self._scene_ids.pop(character_id, [])
+            self._scene_numbers.pop(character_id, None)
+            for scene_id in scene_ids:
+                del self.scenes[scene_id]
+                self._children.pop(scene_id, None)
+            return len(scene_ids)
+
+    # -- scenes -------------------------------------------------------------
+
+    def add_scene(self, scene: Union[Scene, SceneRecord]) -> None:
+        """Store a scene; appending the next sceneNumber of a character is O(1)"""
+        with self._lock:
+            scene = SceneRecord.from_scene(scene)
+            previous = self.scenes.get(scene.id)
+            if previous is not None:
+                # Rewritten scene: the rolling recap no longer describes it
+                self._unindex_scene(previous)
+                self._recaps.pop(scene.characterId, None)
+                if scene.branchId is None:
+                    scene.branchId, scene.depth = previous.branchId, previous.depth
+            parent = self.scenes.get(scene.previousSceneId) if scene.previousSceneId else None
+            if parent is not None:
+                # Share the parent's id string rather than hold a second copy
+                scene.previousSceneId = parent.id
+            if scene.branchId is None:
+                scene.branchId, scene.depth = self.allocate_branch(scene.characterId, parent)
+            self._place_in_branch(scene)
+            self.scenes[scene.id] = scene
+            self._writes += 1
+            self._versions[scene.characterId] = self._writes
+
+            ids = self._scene_ids.setdefault(scene.characterId, [])
+            numbers = self._scene_numbers.setdefault(scene.characterId, [])
+            if not numbers or scene.sceneNumber >= numbers[-1]:
+                ids.append(scene.id)
+                numbers.append(scene.sceneNumber)
+            else:
+                position = bisect.bisect_right(numbers, scene.sceneNumber)
+                ids.insert(position, scene.id)
+                numbers.insert(position, scene.sceneNumber)
+
+            if scene.previousSceneId:
+                self._children.setdefault(scene.previousSceneId, []).append(scene.id)
+
+    def append_scene(self, scene: SceneRecord) -> SceneRecord:
+        """Number, place (from previousSceneId) and store a newly generated scene"""
+        with self._lock:
+            if scene.characterId not in self.characters:
+                raise ValueError(f"Character {scene.characterId} was deleted")
+            scene.sceneNumber = self.allocate_scene_number(scene.characterId)
+            self.add_scene(scene)
+            return scene
+
+    def _unindex_scene(self, scene: SceneRecord) -> None:
+        ids = self._scene_ids.get(scene.characterId, [])
+        if scene.id in ids:
+            position = ids.index(scene.id)
+            del ids[position]
+            del self._scene_numbers[scene.characterId][position]
+        if scene.previousSceneId in self._children:
+            self._children[scene.previousSceneId].remove(scene.id)
+
+    def add_scenes(self, scenes: List[Union[Scene, SceneRecord]]) -> None:
+        with self._lock:
+            for scene in scenes:
+                self.add_scene(scene)
+
+    def get_scene(self, scene_id: str) -> Optional[SceneRecord]:
+        return self.scenes.get(scene_id)
+
+    def has_scene(self, scene_id: str) -> bool:
+        return scene_id in self.scenes
+
+    def character_scenes(self, character_id: str) -> List[SceneRecord]:
+        """All scenes of a character, ordered by sceneNumber"""
+        with self._lock:
+            return [self.scenes[scene_id] for scene_id in self._scene_ids.get(character_id, [])]
+
+    def scene_page(self, character_id: str, after: int = 0, limit: Optional[int] = None) -> List[SceneRecord]:
+        """Scenes with sceneNumber > after, ordered by sceneNumber, at most limit of them"""
+        with self._lock:
+            numbers = self._scene_numbers.get(character_id, [])
+            start = bisect.bisect_right(numbers, after)
+            ids = self._scene_ids.get(character_id, [])
+            end = len(ids) if limit is None else start + limit
+            return [self.scenes[scene_id] for scene_id in ids[start:end]]
+
+    def history_version(self, character_id: str) -> str:
+        """Opaque value that changes whenever any scene of the character is written"""
+        return f"{self._epoch}.{self._versions.get(character_id, 0)}"
+
+    def scene_count(self, character_id: str) -> int:
+        return len(self._scene_ids.get(character_id, []))
+
+    def allocate_scene_number(self, character_id: str) -> int:
+        """Atomically reserve the next sceneNumber, even before the scene is stored"""
+        with self._lock:
+            numbers = self._scene_numbers.get(character_id)
+            number = max(numbers[-1] if numbers else 0, self._allocated.get(character_id, 0)) + 1
+            self._allocated[character_id] = number
+            return number
+
+    def child_scenes(self, scene_id: str) -> List[SceneRecord]:
+        """Scenes whose previousSceneId points at scene_id"""
+        with self._lock:
+            return [self.scenes[child_id] for child_id in self._children.get(scene_id, [])]
+
+    def scene_chain(self, scene_id: str) -> List[SceneRecord]:
+        """Lineage of a scene from the first scene of its story, returned oldest first"""
+        with self._lock:
+            segments = []
+            scene = self.scenes.get(scene_id)
+            while scene is not None:
+                branch = self._branches[scene.branchId]
+                segments.append(branch.scene_ids[:scene.depth - branch.base_depth])
+                scene = self.scenes.get(branch.fork_scene_id) if branch.fork_scene_id else None
+            return [self.scenes[i] for segment in reversed(segments) for i in segment]
+
+    # -- branches -----------------------------------------------------------
+
+    def allocate_branch(self, character_id: str, parent: Optional[SceneRecord]) -> Tuple[str, int]:
+        """Atomically reserve (branchId, depth) for a new scene continuing parent (None for a first scene)"""
+        with self._lock:
+            parent_depth = parent.depth if parent is not None else 0
+            branch = self._branches.get(parent.branchId) if parent is not None else None
+            if branch is not None and parent_depth == branch.base_depth + branch.reserved:
+                branch.reserved += 1
+                return branch.id, parent_depth + 1
+            branch = Branch(
+                id=id_generator.new_id("branch"),
+                character_id=character_id,
+                fork_scene_id=parent.id if parent is not None else None,
+                base_depth=parent_depth,
+                scene_ids=[],
+                reserved=1
+            )
+            self._branches[branch.id] = branch
+            self._character_branches.setdefault(character_id, []).append(branch.id)
+            return branch.id, parent_depth + 1
+
+    def _place_in_branch(self, scene: SceneRecord) -> None:
+        branch = self._branches.get(scene.branchId)
+        if branch is None:
+            # Placed by another store (imports): the branch starts at this scene
+            branch = self._branches[scene.branchId] = Branch(
+                id=scene.branchId,
+                character_id=scene.characterId,
+                fork_scene_id=scene.previousSceneId,
+                base_depth=scene.depth - 1,
+                scene_ids=[]
+            )
+            self._character_branches.setdefault(scene.characterId, []).append(branch.id)
+        position = scene.depth - branch.base_depth - 1
+        if position < len(branch.scene_ids):
+            branch.scene_ids[position] = scene.id
+        else:
+            branch.scene_ids.append(scene.id)
+        branch.reserved = max(branch.reserved, position + 1)
+
+    def character_branches(self, character_id: str) -> List[Dict[str, Any]]:
+        """Branches of a character in creation order"""
+        with self._lock:
+            return [
+                branch.info()
+                for branch in (self._branches[branch_id] for branch_id in self._character_branches.get(character_id, []))
+                if branch.scene_ids
+            ]
+
+    # -- recaps -------------------------------------------------------------
+
+    def get_recap(self, character_id: str) -> Optional[RecapState]:
+        return self._recaps.get(character_id)
+
+    def save_recap(self, character_id: str, recap: RecapState) -> None:
+        with self._lock:
+            if character_id in self.characters:
+                self._recaps[character_id] = recap
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Everything is already in memory: there is no read cache"""
+        return {"size": 0, "entries": 0, "hits": 0, "misses": 0, "invalidations": 0}
+
+    # -- jobs ---------------------------------------------------------------
+
+    def save_job(self, job: Job) -> None:
+        self._jobs[job.id] = job
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def claim_job(self, job_id: str, now: float, lease_seconds: float) -> Optional[Job]:
+        """Atomically take a job for running; None if it is gone, finished or leased elsewhere"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job if job is not None and job.claim(now, lease_seconds) else None
+
+    def resumable_jobs(self, now: float) -> List[str]:
+        """Ids of queued jobs and running jobs whose lease expired, oldest first"""
+        with self._lock:
+            return [
+                job.id for job in self._jobs.values()
+                if job.status == "queued" or (job.status == "running" and job.lease_until < now)
+            ]
+
+
+class SQLiteStoryStore:
+    """Durable StoryStore on embedded SQLite, shared by every worker using the same file.
+
+    Same interface as StoryStore. The database runs in WAL mode so readers
+    never block the writer, scenes are indexed by (characterId, sceneNumber)
+    and by previousSceneId, and each thread gets its own connection whose
+    statement cache keeps the fixed SQL below prepared.
+
+    With cache_size > 0, characters and scenes read by id are also kept in
+    a per-process LRU. Rewrites and deletes append the keys they touch to
+    a `changes` log in the same transaction; before each cached read a
+    process checks PRAGMA data_version and, if another connection has
+    committed since, evicts every key logged after the last one it saw.
+    """
+
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS characters (id TEXT PRIMARY KEY, data TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS scenes ("
+        " id TEXT PRIMARY KEY, character_id TEXT NOT NULL, scene_number INTEGER NOT NULL,"
+        " previous_scene_id TEXT, data TEXT NOT NULL, branch_id TEXT, depth INTEGER)",
+        "CREATE INDEX IF NOT EXISTS scenes_by_character ON scenes (character_id, scene_number)",
+        "CREATE INDEX IF NOT EXISTS scenes_by_previous ON scenes (previous_scene_id)",
+        "CREATE TABLE IF NOT EXISTS recaps ("
+        " character_id TEXT PRIMARY KEY, summary TEXT NOT NULL, version TEXT NOT NULL,"
+        " last_number INTEGER NOT NULL, scene_count INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS scene_counters (character_id TEXT PRIMARY KEY, last_number INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS branches ("
+        " id TEXT PRIMARY KEY, character_id TEXT NOT NULL, fork_scene_id TEXT,"
+        " base_depth INTEGER NOT NULL, reserved INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS branches_by_character ON branches (character_id)",
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " id TEXT PRIMARY KEY, status TEXT NOT NULL, lease_until REAL NOT NULL, data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, lease_until)",
+        "CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL)",
+    ]
+
+    # Entries kept in the changes log; a process that falls further behind drops its whole cache
+    CHANGE_LOG_SIZE = 100000
+
+    # Calls wait on disk and on other writers' locks: async code runs them in a thread (run_store)
+    blocking = True
+
+    def __init__(self, path: str, cache_size: int = 0):
+        self.path = path
+        self._local = threading.local()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped on every eviction, so a read that raced with one doesn't cache what it loaded
+        self._generation = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.invalidations = 0
+        with self.transaction() as db:
+            if "scene_ids" in {row[1] for row in db.execute("PRAGMA table_info(recaps)")}:
+                # Recaps of files written before they tracked sceneNumbers: regenerated on demand
+                db.execute("DROP TABLE recaps")
+            for statement in self.SCHEMA:
+                db.execute(statement)
+            if "branch_id" not in {row[1] for row in db.execute("PRAGMA table_info(scenes)")}:
+                # File written before scenes had branches
+                db.execute("ALTER TABLE scenes ADD COLUMN branch_id TEXT")
+                db.execute("ALTER TABLE scenes ADD COLUMN depth INTEGER")
+            db.execute("CREATE INDEX IF NOT EXISTS scenes_by_branch ON scenes (branch_id, depth)")
+            self._backfill_branches(db)
+            self._seen_change = db.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, cached_statements=256)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one atomic, single-fsync transaction"""
+        db = self.db
+        if db.in_transaction:
+            yield db
+            return
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    # -- characters ---------------------------------------------------------
+
+    def add_character(self, character: Character) -> None:
+        self.add_characters([character])
+
+    def add_characters(self, characters: List[Character]) -> None:
+        """Store a batch of characters in one transaction"""
+        keys = [f"c:{character.id}" for character in characters]
+        with self.transaction() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO characters (id, data) VALUES (?, ?)",
+                [(character.id, character.model_dump_json()) for character in characters]
+            )
+            self._log_changes(db, keys)
+        self._evict(keys)
+
+    def get_character(self, character_id: str) -> Optional[Character]:
+        return self._cached(f"c:{character_id}", lambda: self._load_character(character_id))
+
+    def _load_character(self, character_id: str) -> Optional[Character]:
+        row = self.db.execute("SELECT data FROM characters WHERE id = ?", (character_id,)).fetchone()
+        return Character.model_validate_json(row[0]) if row else None
+
+    def has_character(self, character_id: str) -> bool:
+        if self.cache_size:
+            return self.get_character(character_id) is not None
+        return self.db.execute("SELECT 1 FROM characters WHERE id = ?", (character_id,)).fetchone() is not None
+
+    def character_ids(self) -> List[str]:
+        """Ids of every character, oldest first"""
+        return [row[0] for row in self.db.execute("SELECT id FROM characters ORDER BY rowid")]
+
+    def delete_character(self, character_id: str) -> int:
+        """Delete a character and its scenes, returning the number of scenes removed"""
+        with self.transaction() as db:
+            keys = [f"c:{character_id}"] + [
+                f"s:{row[0]}" for row in db.execute("SELECT id FROM scenes WHERE character_id = ?", (character_id,))
+            ]
+            self._log_changes(db, keys)
+            db.execute("DELETE FROM characters WHERE id = ?", (character_id,))
+            db.execute("DELETE FROM recaps WHERE character_id = ?", (character_id,))
+            db.execute("DELETE FROM scene_counters WHERE character_id = ?", (character_id,))
+            db.execute("DELETE FROM branches WHERE character_id = ?", (character_id,))
+            removed = db.execute("DELETE FROM scenes WHERE character_id = ?", (character_id,)).rowcount
+        self._evict(keys)
+        return removed
+
+    # -- scenes -------------------------------------------------------------
+
+    def add_scene(self, scene: Union[Scene, SceneRecord]) -> None:
+        self.add_scenes([scene])
+
+    def add_scenes(self, scenes: List[Union[Scene, SceneRecord]]) -> None:
+        """Store a batch of scenes in one transaction"""
+        scenes = [SceneRecord.from_scene(s) for s in scenes]
+        with self.transaction() as db:
+            placed: Dict[str, Tuple[str, int]] = {}
+            for s in scenes:
+                if s.branchId is None:
+                    s.branchId, s.depth = self._place(db, s, placed)
+                else:
+                    self._register_branch(db, s)
+                placed[s.id] = (s.branchId, s.depth)
+            rows = [
+                (s.id, s.characterId, s.sceneNumber, s.previousSceneId, s.to_json(), s.branchId, s.depth)
+                for s in scenes
+            ]
+            # Rewritten scenes: the rolling recap no longer describes them, and cached copies are stale
+            replaced = []
+            for start in range(0, len(rows), 500):
+                ids = [row[0] for row in rows[start:start + 500]]
+                replaced.extend(db.execute(
+                    f"SELECT id, character_id FROM scenes WHERE id IN ({','.join('?' * len(ids))})", ids
+                ))
+            db.executemany("DELETE FROM recaps WHERE character_id = ?", {(row[1],) for row in replaced})
+            keys = [f"s:{row[0]}" for row in replaced]
+            self._log_changes(db, keys)
+            db.executemany(
+                "INSERT OR REPLACE INTO scenes (id, character_id, scene_number, previous_scene_id, data, branch_id, depth) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        self._evict(keys)
+
+    def append_scene(self, scene: SceneRecord) -> SceneRecord:
+        """Number, place (from previousSceneId) and store a newly generated scene in one transaction"""
+        with self.transaction() as db:
+            if db.execute("SELECT 1 FROM characters WHERE id = ?", (scene.characterId,)).fetchone() is None:
+                raise ValueError(f"Character {scene.characterId} was deleted")
+            scene.sceneNumber = self.allocate_scene_number(scene.characterId)
+            self.add_scenes([scene])
+        return scene
+
+    def get_scene(self, scene_id: str) -> Optional[SceneRecord]:
+        return self._cached(f"s:{scene_id}", lambda: self._load_scene(scene_id))
+
+    def _load_scene(self, scene_id: str) -> Optional[SceneRecord]:
+        row = self.db.execute("SELECT data FROM scenes WHERE id = ?", (scene_id,)).fetchone()
+        return SceneRecord.from_json(row[0]) if row else None
+
+    def has_scene(self, scene_id: str) -> bool:
+        if self.cache_size:
+            return self.get_scene(scene_id) is not None
+        return self.db.execute("SELECT 1 FROM scenes WHERE id = ?", (scene_id,)).fetchone() is not None
+
+    def character_scenes(self, character_id: str) -> List[SceneRecord]:
+        """All scenes of a character, ordered by sceneNumber"""
+        rows = self.db.execute(
+            "SELECT data FROM scenes WHERE character_id = ? ORDER BY scene_number",
+            (character_id,)
+        )
+        return [SceneRecord.from_json(row[0]) for row in rows]
+
+    def scene_page(self, character_id: str, after: int = 0, limit: Optional[int] = None) -> List[SceneRecord]:
+        """Scenes with sceneNumber > after, ordered by sceneNumber, at most limit of them"""
+        rows = self.db.execute(
+            "SELECT data FROM scenes WHERE character_id = ? AND scene_number > ? ORDER BY scene_number LIMIT ?",
+            (character_id, after, -1 if limit is None else limit)
+        )
+        return [SceneRecord.from_json(row[0]) for row in rows]
+
+    def history_version(self, character_id: str) -> str:
+        """Opaque value that changes whenever any scene of the character is written"""
+        # INSERT OR REPLACE gives a rewritten scene a new rowid, so MAX(rowid) moves on every write.
+        # Rowids freed by a delete are reused, though: the changes log sequence, which every delete
+        # advances and never hands out twice, keeps a re-created character from repeating a version.
+        count, last_row, last_change = self.db.execute(
+            "SELECT COUNT(*), MAX(rowid), (SELECT seq FROM sqlite_sequence WHERE name = 'changes')"
+            " FROM scenes WHERE character_id = ?", (character_id,)
+        ).fetchone()
+        return f"{count}.{last_row or 0}.{last_change or 0}"
+
+    def scene_count(self, character_id: str) -> int:
+        return self.db.execute(
+            "SELECT COUNT(*) FROM scenes WHERE character_id = ?", (character_id,)
+        ).fetchone()[0]
+
+    def allocate_scene_number(self, character_id: str) -> int:
+        """Atomically reserve the next sceneNumber across every worker sharing the file"""
+        with self.transaction() as db:
+            row = db.execute(
+                "SELECT MAX(n) FROM ("
+                " SELECT last_number AS n FROM scene_counters WHERE character_id = ?"
+                " UNION ALL SELECT MAX(scene_number) FROM scenes WHERE character_id = ?)",
+                (character_id, character_id)
+            ).fetchone()
+            number = (row[0] or 0) + 1
+            db.execute(
+                "INSERT OR REPLACE INTO scene_counters (character_id, last_number) VALUES (?, ?)",
+                (character_id, number)
+            )
+            return number
+
+    def child_scenes(self, scene_id: str) -> List[SceneRecord]:
+        """Scenes whose previousSceneId points at scene_id"""
+        rows = self.db.execute("SELECT data FROM scenes WHERE previous_scene_id = ?", (scene_id,))
+        return [SceneRecord.from_json(row[0]) for row in rows]
+
+    def scene_chain(self, scene_id: str) -> List[SceneRecord]:
+        """Lineage of a scene from the first scene of its story, returned oldest first"""
+        db = self.db
+        segments = []
+        position = db.execute("SELECT branch_id, depth FROM scenes WHERE id = ?", (scene_id,)).fetchone()
+        while position is not None:
+            branch_id, depth = position
+            segments.append(db.execute(
+                "SELECT data FROM scenes WHERE branch_id = ? AND depth <= ? ORDER BY depth", (branch_id, depth)
+            ).fetchall())
+            fork = db.execute("SELECT fork_scene_id FROM branches WHERE id = ?", (branch_id,)).fetchone()
+            position = db.execute(
+                "SELECT branch_id, depth FROM scenes WHERE id = ?", (fork[0],)
+            ).fetchone() if fork and fork[0] else None
+        return [SceneRecord.from_json(row[0]) for segment in reversed(segments) for row in segment]
+
+    # -- branches -----------------------------------------------------------
+
+    def allocate_branch(self, character_id: str, parent: Optional[SceneRecord]) -> Tuple[str, int]:
+        """Atomically reserve (branchId, depth) for a new scene continuing parent (None for a first scene)"""
+        with self.transaction() as db:
+            if parent is None:
+                return self._reserve(db, character_id, None, None, 0)
+            return self._reserve(db, character_id, parent.id, parent.branchId, parent.depth)
+
+    def _reserve(
+        self,
+        db: sqlite3.Connection,
+        character_id: str,
+        parent_id: Optional[str],
+        parent_branch: Optional[str],
+        parent_depth: int
+    ) -> Tuple[str, int]:
+        if parent_branch is not None:
+            row = db.execute("SELECT base_depth, reserved FROM branches WHERE id = ?", (parent_branch,)).fetchone()
+            if row is not None and parent_depth == row[0] + row[1]:
+                db.execute("UPDATE branches SET reserved = reserved + 1 WHERE id = ?", (parent_branch,))
+                return parent_branch, parent_depth + 1
+        branch_id = id_generator.new_id("branch")
+        db.execute(
+            "INSERT INTO branches (id, character_id, fork_scene_id, base_depth, reserved) VALUES (?, ?, ?, ?, 1)",
+            (branch_id, character_id, parent_id, parent_depth)
+        )
+        return branch_id, parent_depth + 1
+
+    def _place(self, db: sqlite3.Connection, scene: SceneRecord, placed: Dict[str, Tuple[str, int]]) -> Tuple[str, int]:
+        """(branchId, depth) for a scene stored without one; placed holds scenes of the same batch"""
+        existing = db.execute("SELECT branch_id, depth FROM scenes WHERE id = ?", (scene.id,)).fetchone()
+        if existing is not None and existing[0] is not None:
+            return existing
+        parent = placed.get(scene.previousSceneId) if scene.previousSceneId else None
+        if parent is None and scene.previousSceneId:
+            parent = db.execute(
+                "SELECT branch_id, depth FROM scenes WHERE id = ?", (scene.previousSceneId,)
+            ).fetchone()
+        if parent is None or parent[0] is None:
+            return self._reserve(db, scene.characterId, None, None, 0)
+        return self._reserve(db, scene.characterId, scene.previousSceneId, parent[0], parent[1])
+
+    def _register_branch(self, db: sqlite3.Connection, scene: SceneRecord) -> None:
+        """Record the branch of a scene placed elsewhere (imports) or extend its reservation"""
+        db.execute(
+            "INSERT INTO branches (id, character_id, fork_scene_id, base_depth, reserved) VALUES (?, ?, ?, ?, 1) "
+            "ON CONFLICT (id) DO UPDATE SET reserved = MAX(reserved, ? - base_depth)",
+            (scene.branchId, scene.characterId, scene.previousSceneId, scene.depth - 1, scene.depth)
+        )
+
+    def _backfill_branches(self, db: sqlite3.Connection) -> None:
+        """Place scenes stored before branches existed, parents (lower sceneNumbers) first"""
+        rows = db.execute(
+            "SELECT data FROM scenes WHERE branch_id IS NULL ORDER BY character_id, scene_number"
+        ).fetchall()
+        for row in rows:
+            scene = SceneRecord.from_json(row[0])
+            scene.branchId, scene.depth = self._place(db, scene, {})
+            db.execute(
+                "UPDATE scenes SET branch_id = ?, depth = ?, data = ? WHERE id = ?",
+                (scene.branchId, scene.depth, scene.to_json(), scene.id)
+            )
+        if rows:
+            logger.info(f"🌿 Placed {len(rows)} existing scenes on story branches")
+
+    def character_branches(self, character_id: str) -> List[Dict[str, Any]]:
+        """Branches of a character in creation order"""
+        rows = self.db.execute(
+            "SELECT b.id, b.fork_scene_id, b.base_depth, COUNT(s.id),"
+            " (SELECT id FROM scenes WHERE branch_id = b.id ORDER BY depth DESC LIMIT 1)"
+            " FROM branches b JOIN scenes s ON s.branch_id = b.id"
+            " WHERE b.character_id = ? GROUP BY b.id ORDER BY b.rowid",
+            (character_id,)
+        )
+        return [
+            {"branchId": row[0], "forkSceneId": row[1], "baseDepth": row[2], "length": row[3], "tipSceneId": row[4]}
+            for row in rows
+        ]
+
+    # -- recaps -------------------------------------------------------------
+
+    def get_recap(self, character_id: str) -> Optional[RecapState]:
+        row = self.db.execute(
+            "SELECT summary, version, last_number, scene_count FROM recaps WHERE character_id = ?", (character_id,)
+        ).fetchone()
+        return RecapState(*row) if row else None
+
+    def save_recap(self, character_id: str, recap: RecapState) -> None:
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO recaps (character_id, summary, version, last_number, scene_count) "
+                "SELECT id, ?, ?, ?, ? FROM characters WHERE id = ?",
+                (recap.summary, recap.version, recap.last_number, recap.scene_count, character_id)
+            )
+
+    # -- read cache ---------------------------------------------------------
+
+    def _cached(self, key: str, load: Callable[[], Any]) -> Any:
+        if not self.cache_size:
+            return load()
+        self._sync_cache()
+        with self._cache_lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return value
+            self.cache_misses += 1
+            generation = self._generation
+        value = load()
+        if value is not None:
+            with self._cache_lock:
+                if generation == self._generation:
+                    self._cache[key] = value
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return value
+
+    def _sync_cache(self) -> None:
+        """Evict keys other connections changed since this thread last looked"""
+        db = self.db
+        version = db.execute("PRAGMA data_version").fetchone()[0]
+        if version == getattr(self._local, "data_version", None):
+            return
+        self._local.data_version = version
+        with self._cache_lock:
+            rows = db.execute("SELECT seq, key FROM changes WHERE seq > ? ORDER BY seq", (self._seen_change,)).fetchall()
+            if not rows:
+                return
+            oldest = db.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if oldest > self._seen_change + 1:
+                # Fell behind the pruned log: anything cached may be stale
+                self._cache.clear()
+            for _, key in rows:
+                self._cache.pop(key, None)
+            self._seen_change = rows[-1][0]
+            self._generation += 1
+            self.invalidations += len(rows)
+
+    def _log_changes(self, db: sqlite3.Connection, keys: List[str]) -> None:
+        """Record rewritten or deleted keys for the caches of every process"""
+        if not keys:
+            return
+        db.executemany("INSERT INTO changes (key) VALUES (?)", [(key,) for key in keys])
+        last = db.execute("SELECT last_insert_rowid()").fetchone()[0]
+        if last % 1000 < len(keys):
+            db.execute("DELETE FROM changes WHERE seq <= ?", (last - self.CHANGE_LOG_SIZE,))
+
+    def _evict(self, keys: List[str]) -> None:
+        if not self.cache_size or not keys:
+            return
+        with self._cache_lock:
+            for key in keys:
+                self._cache.pop(key, None)
+            self._generation += 1
+
+    def cache_stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.cache_size,
+            "entries": len(self._cache),
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "invalidations": self.invalidations
+        }
+
+    # -- jobs ---------------------------------------------------------------
+
+    def save_job(self, job: Job) -> None:
+        with self.transaction() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, lease_until, data) VALUES (?, ?, ?, ?)",
+                (job.id, job.status, job.lease_until, json.dumps(asdict(job)))
+            )
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        row = self.db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(**json.loads(row[0])) if row else None
+
+    def claim_job(self, job_id: str, now: float, lease_seconds: float) -> Optional[Job]:
+        """Atomically take a job for running, across every worker sharing the file"""
+        with self.transaction():
+            job = self.get_job(job_id)
+            if job is None or not job.claim(now, lease_seconds):
+                return None
+            self.save_job(job)
+            return job
+
+    def resumable_jobs(self, now: float) -> List[str]:
+        """Ids of queued jobs and running jobs whose lease expired, oldest first"""
+        rows = self.db.execute(
+            "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)"
+            " ORDER BY json_extract(data, '$.created_at')",
+            (now,)
+        )
+        return [row[0] for row in rows]
+
+
+# CHRONICLE_DB_PATH switches from process-local memory to a durable SQLite file
+db_path = os.environ.get("CHRONICLE_DB_PATH", "")
+store = SQLiteStoryStore(
+    db_path, cache_size=int(os.environ.get("CHRONICLE_STORE_CACHE_SIZE", "10000"))
+) if db_path else StoryStore()
+logger.info(f"💾 Storage: {'SQLite at ' + db_path if db_path else 'in-memory'}")
+if not db_path and int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+    logger.warning("⚠️  Several workers with in-memory storage: each sees only its own characters; set CHRONICLE_DB_PATH")
+
+
+async def run_store(call: Callable[..., T], *args: Any) -> T:
+    """Call a store method (or a function doing store I/O) from async code.
+
+    SQLite calls can wait on disk or, with several workers, on another
+    writer's lock for up to busy_timeout, so they run in a thread instead
+    of stalling every request on the event loop.
+    """
+    if store.blocking:
+        return await asyncio.to_thread(call, *args)
+    return call(*args)
+
+# Above this many new scenes, recaps summarize chunks first and then fold the chunk summaries
+recap_chunk_size = int(os.environ.get("CHRONICLE_RECAP_CHUNK_SIZE", "20"))
+
+# ============================================================================
+# CACHES
+# ============================================================================
+
+def normalize_command(command: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of an edit command"""
+    return " ".join(command.lower().split()).strip("\"'").rstrip(".!?").strip()
+
+
+def edit_cache_key(character: Character, scene: SceneRecord, command: str) -> str:
+    """Content address of a parse_edit_command call: everything its prompt reads"""
+    material = "\x1f".join([
+        character.name,
+        character.canonicalAppearance,
+        character.personality,
+        "\x1e".join(character.immutableTraits),
+        scene.sceneDescription,
+        scene.emotionalState,
+        scene.environment,
+        normalize_command(command),
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class EditCache:
+    """LRU + TTL cache of parse_edit_command results keyed by edit_cache_key.
+
+    Entries are held as compact JSON and bounded both by count and by
+    approximate bytes. With a sqlite_path, entries are also written through
+    to SQLite so they survive restarts and are shared by workers on one host.
+    That file is read and written in a thread, and only briefly waits for
+    another worker's write lock: a failed read is a miss and a failed write
+    is skipped, since the edit itself has already been answered.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 3600.0,
+        sqlite_path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.sqlite_path = sqlite_path
+        self._local = threading.local()
+        if sqlite_path:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS edit_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.sqlite_path, timeout=1, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    async def get(self, key: str) -> Optional[EditAnalysis]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] > self.ttl:
+            self._drop(key)
+            entry = None
+        if entry is None and self.sqlite_path:
+            try:
+                row = await asyncio.to_thread(self._load, key, now - self.ttl)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Edit cache read failed, treating it as a miss: {e}")
+                row = None
+            if row is not None:
+                entry = (row[0], row[1])
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return EditAnalysis.model_validate_json(entry[1])
+
+    async def put(self, key: str, analysis: EditAnalysis) -> None:
+        entry = (time.time(), analysis.model_dump_json())
+        self._remember(key, entry)
+        if self.sqlite_path:
+            try:
+                await asyncio.to_thread(self._store, key, entry)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️  Edit cache write skipped: {e}")
+
+    def _load(self, key: str, oldest: float) -> Optional[Tuple[float, str]]:
+        return self.db.execute(
+            "SELECT created, value FROM edit_cache WHERE key = ? AND created >= ?", (key, oldest)
+        ).fetchone()
+
+    def _store(self, key: str, entry: Tuple[float, str]) -> None:
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute(
+                "INSERT OR REPLACE INTO edit_cache (key, value, created) VALUES (?, ?, ?)",
+                (key, entry[1], entry[0])
+            )
+            db.execute("DELETE FROM edit_cache WHERE created < ?", (entry[0] - self.ttl,))
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _remember(self, key: str, entry: Tuple[float, str]) -> None:
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = entry
+        self._bytes += len(key) + len(entry[1])
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hitRate": self.hits / lookups if lookups else 0.0
+        }
+
+
+edit_cache = EditCache(
+    max_entries=int(os.environ.get("CHRONICLE_EDIT_CACHE_SIZE", "10000")),
+    max_bytes=int(os.environ.get("CHRONICLE_EDIT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.environ.get("CHRONICLE_EDIT_CACHE_TTL", "3600")),
+    sqlite_path=os.environ.get("CHRONICLE_EDIT_CACHE_PATH") or None
+)
+
+# ============================================================================
+# LOCAL EDIT PRE-FILTER
+# ============================================================================
+
+COLOR_TERMS = {
+    "black", "white", "grey", "gray", "silver", "brown", "blue", "green", "hazel",
+    "amber", "red", "auburn", "blonde", "blond", "golden", "gold", "purple", "violet",
+    "pink", "orange", "yellow", "teal", "copper", "ginger", "platinum", "dark", "pale",
+}
+# Colours that also describe passing states ("eyes red from crying", "dark with anger"), never a recolour
+COLOR_STATES = {"dark", "pale", "red", "pink"}
+TRAIT_STOPWORDS = {
+    "a", "an", "the", "of", "and", "with", "her", "his", "their", "its", "small", "big",
+    "large", "short", "long", "sharp", "soft", "worn", "left", "right", "above", "below",
+}
+_TRAIT_PREPOSITION = re.compile(r"\b(?:above|below|on|in|over|under|near|across|at|with|of)\b")
+_REMOVAL_PATTERN = re.compile(
+    r"\b(?:remove[sd]?|removing|los(?:e|es|t|ing)|without|erase[sd]?|shave[sd]?|"
+    r"get(?:s|ting)? rid of|got rid of|take[sn]? off|took off|no longer (?:has|have|wears?))\b"
+)
+_CHANGE_PATTERN = re.compile(
+    r"\b(?:chang(?:e|es|ed|ing)|alter(?:s|ed)?|dye[sd]?|dyeing|swap(?:s|ped)?|"
+    r"replace[sd]?|different|recolou?r(?:s|ed)?|turn(?:s|ed)?)\b"
+)
+
+# Commands made only of these words and at least one emotion are trivially valid emotion changes
+EMOTION_STATES = {
+    "smile": "smiling", "smiles": "smiling", "smiling": "smiling", "grin": "grinning",
+    "grins": "grinning", "laugh": "laughing", "laughs": "laughing", "laughing": "laughing",
+    "frown": "frowning", "frowns": "frowning", "cry": "crying", "cries": "crying",
+    "happy": "happy", "sad": "sad", "tired": "tired", "exhausted": "exhausted",
+    "worried": "worried", "anxious": "anxious", "nervous": "nervous", "angry": "angry",
+    "furious": "furious", "afraid": "afraid", "scared": "scared", "calm": "calm",
+    "relaxed": "relaxed", "excited": "excited", "surprised": "surprised", "shocked": "shocked",
+    "determined": "determined", "relieved": "relieved", "confused": "confused",
+    "thoughtful": "thoughtful", "hopeful": "hopeful", "bored": "bored", "curious": "curious",
+    "focused": "focused", "sleepy": "sleepy", "melancholy": "melancholy", "content": "content",
+}
+EMOTION_FILLER = {
+    "make", "makes", "let", "her", "him", "them", "she", "he", "they", "she's", "he's",
+    "they're", "is", "are", "was", "be", "become", "becomes", "look", "looks", "looking",
+    "feel", "feels", "feeling", "seem", "seems", "get", "gets", "getting", "grow", "grows",
+    "and", "but", "very", "really", "a", "bit", "little", "more", "slightly", "now",
+    "suddenly", "quite", "so", "too", "start", "starts", "begin", "begins", "to",
+}
+
+
+_REMOVAL_AT_END = re.compile(rf"(?:{_REMOVAL_PATTERN.pattern})$")
+_CHANGE_AT_END = re.compile(rf"(?:{_CHANGE_PATTERN.pattern})$")
+_REMOVED_AFTER = re.compile(r"^\s*(?:(?:is|are|was|were|gets?|got) )?(?:removed|erased|shaved off|gone|taken off|lost)\b")
+_BECOMES_PATTERN = re.compile(r"^\s*(?:turns?|turned|turning|becomes?|became|goes|went|(?:is|are) now)\s+")
+
+
+class CanonMatcher:
+    """Compiled per-character index of immutable trait nouns for local edit screening.
+
+    Every immutable trait contributes its head noun ("brown eyes" -> eyes,
+    "scar above left eyebrow" -> scar) with the words in front of it
+    ("leather jacket" -> leather), and the canonical appearance adds the
+    colours it gives those nouns. All nouns are folded into one
+    alternation regex, so a command is scanned once.
+
+    Only nouns the command clearly gives to the character ("her eyes",
+    "her old leather jacket") are judged: removed or changed by the verb
+    right before the possessive, or recoloured by a colour that directly
+    modifies the noun ("blue eyes", "eyes turn blue"). Colours that also
+    describe passing states ("eyes red from crying") and anything less
+    clear are left to the model.
+    """
+
+    def __init__(self, immutable_traits: Tuple[str, ...], appearance: str):
+        # Possessives that refer to the character; "his eyes" in a story about her is someone else's
+        self.owners = {w for w in re.findall(r"[a-z]+", appearance.lower()) if w in ("her", "his", "their")} or {"her", "his", "their"}
+        # noun stem -> (trait text, allowed colours, other words of the trait)
+        self.nouns: Dict[str, Tuple[str, Set[str], Set[str]]] = {}
+        for trait in immutable_traits:
+            head = _TRAIT_PREPOSITION.split(trait.lower())[0]
+            words = [w for w in re.findall(r"[a-z]+", head) if w not in TRAIT_STOPWORDS]
+            nouns = [w for w in words if w not in COLOR_TERMS]
+            if nouns:
+                colors = {w for w in words if w in COLOR_TERMS}
+                self.nouns[self._stem(nouns[-1])] = (trait, colors, set(nouns[:-1]))
+
+        words = re.findall(r"[a-z]+", appearance.lower())
+        for i, word in enumerate(words):
+            if word not in COLOR_TERMS:
+                continue
+            for noun in words[i + 1:i + 3]:
+                if noun not in COLOR_TERMS and noun not in TRAIT_STOPWORDS:
+                    if self._stem(noun) in self.nouns:
+                        self.nouns[self._stem(noun)][1].add(word)
+                    break
+
+        alternation = "|".join(sorted((re.escape(stem) for stem in self.nouns), key=len, reverse=True))
+        self.pattern = re.compile(rf"\b({alternation})(?:e?s)?\b") if alternation else None
+
+    @staticmethod
+    def _stem(noun: str) -> str:
+        return noun[:-1] if noun.endswith("s") and not noun.endswith("ss") else noun
+
+    def violation(self, command: str) -> Optional[str]:
+        """The immutable trait a command clearly breaks, or None"""
+        if self.pattern is None:
+            return None
+        text = command.lower()
+        for match in self.pattern.finditer(text):
+            trait, colors, modifiers = self.nouns[match.group(1)]
+            before = re.findall(r"[a-z']+", text[max(0, match.start() - 60):match.start()])
+            # Colours and the trait's own words ("leather") may stand between the possessive and the noun
+            position = len(before)
+            while position and (before[position - 1] in COLOR_TERMS or before[position - 1] in modifiers):
+                position -= 1
+            if not position or before[position - 1] not in self.owners:
+                continue
+            lead = " ".join(before[:position - 1])
+            if _REMOVAL_AT_END.search(lead) or _CHANGE_AT_END.search(lead) or _REMOVED_AFTER.match(text[match.end():]):
+                return trait
+            if colors:
+                named = set(before[position:])
+                becomes = _BECOMES_PATTERN.match(text[match.end():])
+                if becomes:
+                    following = re.findall(r"[a-z]+", text[match.end() + becomes.end():])
+                    named.update(itertools.takewhile(lambda w: w in COLOR_TERMS, following))
+                # "dark brown eyes" still names the canonical colour
+                named = {w for w in named if w in COLOR_TERMS and w not in COLOR_STATES}
+                if named and not named & colors:
+                    return trait
+        return None
+
+
+@lru_cache(maxsize=4096)
+def canon_matcher(immutable_traits: Tuple[str, ...], appearance: str) -> CanonMatcher:
+    return CanonMatcher(immutable_traits, appearance)
+
+
+def _word_root(word: str) -> str:
+    """Crude stem, so "smile", "smiles" and "smiling" compare equal"""
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+@lru_cache(maxsize=4096)
+def canon_word_roots(immutable_traits: Tuple[str, ...], personality: str) -> Set[str]:
+    """Roots of the words in a character's traits and personality ("never smiles" -> smil)"""
+    return {_word_root(w) for w in re.findall(r"[a-z]+", " ".join(immutable_traits + (personality,)).lower())}
+
+
+class EditPrefilter:
+    """Answers clear-cut edit commands locally instead of asking the model.
+
+    mode "on" rejects clear canon violations and approves pure emotion
+    changes the canon says nothing about, "reject" (the default) only
+    rejects, "off" sends everything to the model.
+    """
+
+    def __init__(self, mode: str = "reject"):
+        self.mode = mode
+        self.rejected = 0
+        self.approved = 0
+        self.passed = 0
+
+    def check(self, character: Character, command: str) -> Optional[EditAnalysis]:
+        if self.mode == "off":
+            return None
+        
+        matcher = canon_matcher(tuple(character.immutableTraits), character.canonicalAppearance)
+        trait = matcher.violation(command)
+        if trait:
+            self.rejected += 1
+            return EditAnalysis(
+                isValid=False,
+                editType="invalid",
+                rejectionReason=f"This edit would change the immutable trait '{trait}'",
+                constraints=[trait],
+                changes={},
+                narrativeDelta=""
+            )
+        
+        if self.mode == "on":
+            words = [w.strip("'") for w in re.findall(r"[a-z']+", command.lower())]
+            emotions = [EMOTION_STATES[w] for w in words if w in EMOTION_STATES]
+            # An emotion the canon talks about ("never smiles", "calm under pressure") needs the model's judgement
+            canon_roots = canon_word_roots(tuple(character.immutableTraits), character.personality)
+            guarded = any(_word_root(w) in canon_roots for w in words if w in EMOTION_STATES)
+            guarded = guarded or any(_word_root(e) in canon_roots for e in emotions)
+            if emotions and not guarded and all(w in EMOTION_STATES or w in EMOTION_FILLER for w in words):
+                self.approved += 1
+                return EditAnalysis(
+                    isValid=True,
+                    editType="emotion_change",
+                    constraints=list(character.immutableTraits),
+                    changes={
+                        "emotionalState": " and ".join(dict.fromkeys(emotions)),
+                        "environment": None,
+                        "visualAdjustments": f"expression and posture show the character {' and '.join(dict.fromkeys(emotions))}"
+                    },
+                    narrativeDelta=command.strip()
+                )
+        
+        self.passed += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "rejected": self.rejected,
+            "approved": self.approved,
+            "passedToModel": self.passed,
+            "modelCallsSaved": self.rejected + self.approved
+        }
+
+
+edit_prefilter = EditPrefilter(mode=os.environ.get("CHRONICLE_EDIT_PREFILTER", "reject"))
+
+# ============================================================================
+# SCENE RETRIEVAL
+# ============================================================================
+
+RETRIEVAL_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "by", "for", "with",
+    "from", "as", "into", "is", "are", "was", "were", "be", "been", "it", "its", "this",
+    "that", "her", "his", "their", "she", "he", "they", "them", "him", "while", "now",
+}
+_RETRIEVAL_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def scene_text(scene: SceneRecord) -> str:
+    """The text of a scene that retrieval matches against"""
+    return f"{scene.sceneDescription} {scene.narrativeSummary}"
+
+
+class SceneIndex:
+    """Incremental hashed TF-IDF index over the scenes of one character.
+
+    Words are hashed into 2**bits features, so memory does not grow with the
+    vocabulary of model-written text. Scenes are weighted lnc (log tf, cosine
+    normalized, no idf) and queries ltc (log tf times idf), so adding a scene
+    never rewrites the weights of older ones. Postings are parallel arrays
+    of scene numbers and weights in insertion order.
+
+    A query keeps its max_terms heaviest features and scans the postings of
+    the rarest ones, up to budget postings in all, to find candidates. The
+    commoner features then only re-rank the best refine candidates, with at
+    most lookups bisections, so a query costs about the same at any number
+    of scenes. Scores are approximate; see `benchmark.py retrieval`.
+    """
+
+    def __init__(self, bits: int = 20, budget: int = 1024, refine: int = 128, lookups: int = 512, max_terms: int = 32):
+        self.mask = (1 << bits) - 1
+        self.budget = budget
+        self.refine = refine
+        self.lookups = lookups
+        self.max_terms = max_terms
+        # feature -> (scene numbers, weights)
+        self.postings: Dict[int, Tuple[array, array]] = {}
+        # scene number -> scene id, None once the scene was replaced
+        self.scene_ids: List[Optional[str]] = []
+        self.numbers: Dict[str, int] = {}
+        self.live = 0
+        # Highest sceneNumber indexed, and when to next check for missed scenes (see SceneRetriever)
+        self.last_number = 0
+        self.verify_at = 0.0
+
+    def features(self, text: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for token in _RETRIEVAL_TOKEN.findall(text.lower()):
+            if token not in RETRIEVAL_STOPWORDS:
+                feature = zlib.crc32(token.encode()) & self.mask
+                counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def add(self, scene_id: str, text: str) -> None:
+        previous = self.numbers.get(scene_id)
+        if previous is not None:
+            # Its old postings stay behind and are skipped when results are read
+            self.scene_ids[previous] = None
+            self.live -= 1
+        number = len(self.scene_ids)
+        self.scene_ids.append(scene_id)
+        self.numbers[scene_id] = number
+        self.live += 1
+        weights = {feature: 1 + math.log(count) for feature, count in self.features(text).items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        for feature, weight in weights.items():
+            posting = self.postings.get(feature)
+            if posting is None:
+                posting = self.postings[feature] = (array("I"), array("f"))
+            posting[0].append(number)
+            posting[1].append(weight / norm)
+
+    @property
+    def dead(self) -> int:
+        return len(self.scene_ids) - self.live
+
+    def search(self, text: str, k: int, exclude: Set[str] = frozenset()) -> List[Tuple[str, float]]:
+        """Up to k (scene id, score) pairs most similar to text, best first"""
+        total = len(self.scene_ids)
+        terms = []
+        for feature, count in self.features(text).items():
+            posting = self.postings.get(feature)
+            if posting is not None:
+                idf = math.log((1 + total) / (1 + len(posting[0]))) + 1
+                terms.append(((1 + math.log(count)) * idf, idf, posting))
+        terms = sorted(heapq.nlargest(self.max_terms, terms, key=lambda term: term[0]), key=lambda term: term[1], reverse=True)
+
+        scores: Dict[int, float] = {}
+        score = scores.get
+        remaining = self.budget
+        common = []
+        for query_weight, _, posting in terms:
+            if len(posting[0]) > remaining:
+                common.append((query_weight, posting))
+                continue
+            remaining -= len(posting[0])
+            for number, weight in zip(*posting):
+                scores[number] = score(number, 0.0) + query_weight * weight
+        if not scores and common:
+            # Nothing rare in the query: seed candidates from the most recent scenes with its rarest word
+            query_weight, (numbers, weights) = common.pop(0)
+            for number, weight in zip(numbers[-self.budget:], weights[-self.budget:]):
+                scores[number] = query_weight * weight
+
+        wanted = k + len(exclude) + self.dead
+        if common:
+            # Common words only re-rank the best candidates, rarest first, within a fixed number of lookups.
+            # Postings are sorted by scene number, so each lookup is a bisection from the last one.
+            candidates = sorted(heapq.nlargest(max(self.refine, wanted), scores, key=score))
+            scores = {number: scores[number] for number in candidates}
+            for query_weight, (numbers, weights) in common[:max(1, self.lookups // len(candidates))]:
+                position, end = 0, len(numbers)
+                for number in candidates:
+                    position = bisect.bisect_left(numbers, number, position)
+                    if position == end:
+                        break
+                    if numbers[position] == number:
+                        scores[number] += query_weight * weights[position]
+
+        results = []
+        for number, score in heapq.nlargest(wanted, scores.items(), key=lambda item: item[1]):
+            scene_id = self.scene_ids[number]
+            if scene_id is not None and scene_id not in exclude:
+                results.append((scene_id, score))
+                if len(results) == k:
+                    break
+        return results
+
+
+class SceneRetriever:
+    """Per-character scene indexes, built in the background and caught up with the store before each query.
+
+    The first query for a character starts building its index in a thread
+    and retrieves nothing until it is ready. Later queries first index the
+    scenes stored after the last sceneNumber the index has seen, so scenes
+    are indexed once and a new scene is searchable on the next query. Every
+    verify_seconds a query also looks back a little for scenes stored out of
+    sceneNumber order by concurrent edits, and if the index's scene count
+    still does not match the store it is rebuilt in the background while the
+    old one keeps answering. Reads go through the store, so scenes written
+    by other workers are picked up too. Least recently used indexes are
+    dropped once all of them together hold more than max_scenes scenes, and
+    a character with more scenes than that is not indexed at all.
+    """
+
+    def __init__(self, top_k: int = 3, max_scenes: int = 100000, lookback: int = 32, verify_seconds: float = 10.0):
+        self.top_k = top_k
+        self.max_scenes = max_scenes
+        self.lookback = lookback
+        self.verify_seconds = verify_seconds
+        self._indexes: "OrderedDict[str, SceneIndex]" = OrderedDict()
+        # Scene entries held by all indexes, replaced ones included
+        self._size = 0
+        self._building: Dict[str, "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.skipped = 0
+        self.indexed = 0
+        self.rebuilds = 0
+        self.query_seconds = 0.0
+
+    def _build(self, character_id: str) -> Optional[SceneIndex]:
+        """A fresh index of every scene of a character, or None if it has more than max_scenes"""
+        if store.scene_count(character_id) > self.max_scenes:
+            return None
+        index = SceneIndex()
+        scenes = store.character_scenes(character_id)
+        for scene in scenes:
+            index.add(scene.id, scene_text(scene))
+        index.last_number = scenes[-1].sceneNumber if scenes else 0
+        index.verify_at = time.monotonic() + self.verify_seconds
+        return index
+
+    def _start_build(self, character_id: str) -> None:
+        task = self._building.get(character_id)
+        loop = asyncio.get_running_loop()
+        if task is None or task.get_loop() is not loop:
+            self._building[character_id] = loop.create_task(self._rebuild(character_id))
+
+    async def _rebuild(self, character_id: str) -> None:
+        try:
+            index = await asyncio.to_thread(self._build, character_id)
+        except Exception as e:
+            logger.warning(f"⚠️  Scene index for {character_id} failed to build: {e}")
+            index = None
+        with self._lock:
+            previous = self._indexes.pop(character_id, None)
+            if previous is not None:
+                self._size -= len(previous.scene_ids)
+                self.rebuilds += 1
+            if index is not None:
+                self._indexes[character_id] = index
+                self._size += len(index.scene_ids)
+                self.indexed += len(index.scene_ids)
+                self._evict()
+        self._building.pop(character_id, None)
+
+    def _evict(self) -> None:
+        while self._size > self.max_scenes and self._indexes:
+            _, index = self._indexes.popitem(last=False)
+            self._size -= len(index.scene_ids)
+
+    def _catch_up(self, character_id: str, index: SceneIndex) -> bool:
+        """Index scenes stored since the last query; True if the index needs a rebuild"""
+        now = time.monotonic()
+        verify = now >= index.verify_at
+        after = max(0, index.last_number - self.lookback) if verify else index.last_number
+        new_scenes = [scene for scene in store.scene_page(character_id, after) if scene.id not in index.numbers]
+        for scene in new_scenes:
+            index.add(scene.id, scene_text(scene))
+            index.last_number = max(index.last_number, scene.sceneNumber)
+        self.indexed += len(new_scenes)
+        self._size += len(new_scenes)
+        if not verify:
+            return False
+        index.verify_at = now + self.verify_seconds
+        return index.live != store.scene_count(character_id) or index.dead > index.live
+
+    def _search(self, character_id: str, text: str, k: int, exclude: Set[str]) -> Tuple[List[SceneRecord], bool]:
+        with self._lock:
+            index = self._indexes.get(character_id)
+            if index is None:
+                # Evicted since the caller looked
+                return [], False
+            self._indexes.move_to_end(character_id)
+            stale = self._catch_up(character_id, index)
+            started = time.perf_counter()
+            matches = index.search(text, k, exclude)
+            self.query_seconds += time.perf_counter() - started
+            self.queries += 1
+            self._evict()
+        scenes = (store.get_scene(scene_id) for scene_id, _ in matches)
+        return [scene for scene in scenes if scene is not None], stale
+
+    async def related(self, character_id: str, text: str, exclude: Set[str] = frozenset(), k: Optional[int] = None) -> List[SceneRecord]:
+        """The k stored scenes of a character most relevant to text, best first; none while its index is built"""
+        k = self.top_k if k is None else k
+        if k <= 0 or not text.strip():
+            return []
+        if character_id not in self._indexes:
+            self._start_build(character_id)
+            self.skipped += 1
+            return []
+        
+        scenes, stale = await run_store(self._search, character_id, text, k, exclude)
+        if stale:
+            self._start_build(character_id)
+        return scenes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "topK": self.top_k,
+            "characters": len(self._indexes),
+            "heldScenes": self._size,
+            "building": len(self._building),
+            "indexedScenes": self.indexed,
+            "rebuilds": self.rebuilds,
+            "queries": self.queries,
+            "skippedQueries": self.skipped,
+            "meanQueryMs": round(1000 * self.query_seconds / self.queries, 3) if self.queries else 0.0
+        }
+
+
+scene_retriever = SceneRetriever(
+    top_k=int(os.environ.get("CHRONICLE_RETRIEVAL_TOP_K", "3")),
+    max_scenes=int(os.environ.get("CHRONICLE_RETRIEVAL_MAX_SCENES", "100000"))
+)
+
+# ============================================================================
+# PROMPT BUILDING
+# ============================================================================
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for budgeting and stub usage"""
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class CanonBlocks:
+    """Rendered, reusable canon text for one character"""
+    full: str
+    edit: str
+    short: str
+    edit_rules: str
+
+
+class PromptBuilder:
+    """Renders orchestration prompts from per-character cached canon blocks.
+
+    Free text from scenes and commands is truncated to scene_text_tokens
+    (keeping the head, the tail, or both ends around an ellipsis), and that
+    limit is halved until the whole prompt fits budget_tokens.
+    """
+
+    def __init__(self, budget_tokens: int = 2000, scene_text_tokens: int = 400, truncation: str = "middle"):
+        if truncation not in ("head", "tail", "middle"):
+            raise ValueError(f"Unknown truncation policy: {truncation}")
+        self.budget_tokens = budget_tokens
+        self.scene_text_tokens = scene_text_tokens
+        self.truncation = truncation
+        self._canon: "OrderedDict[Tuple[Any, ...], CanonBlocks]" = OrderedDict()
+        self.canon_hits = 0
+        self.canon_misses = 0
+        self.truncated = 0
+        self.over_budget = 0
+
+    def canon(self, character: Character) -> CanonBlocks:
+        # Keyed by content, so a character replaced under the same id (import, another worker) never hits stale canon
+        key = (
+            character.id,
+            character.name,
+            character.canonicalAppearance,
+            character.personality,
+            character.emotionalBaseline,
+            tuple(character.immutableTraits)
+        )
+        blocks = self._canon.get(key)
+        if blocks is not None:
+            self._canon.move_to_end(key)
+            self.canon_hits += 1
+            return blocks
+        
+        self.canon_misses += 1
+        traits = ', '.join(character.immutableTraits)
+        identity = f"Name: {character.name}\nAppearance: {character.canonicalAppearance}\nPersonality: {character.personality}"
+        blocks = CanonBlocks(
+            full=f"CHARACTER CANON (IMMUTABLE):\n{identity}\nEmotional Baseline: {character.emotionalBaseline}\nImmutable Traits: {traits}",
+            edit=f"CHARACTER CANON (IMMUTABLE):\n{identity}\nImmutable Traits: {traits}",
+            short=f"CHARACTER CANON: {character.name} - {character.canonicalAppearance}",
+            edit_rules=f"REJECT edits that:\n- Change immutable traits ({traits})\n- Violate core personality\n- Contradict canonical appearance"
+        )
+        self._canon[key] = blocks
+        if len(self._canon) > 4096:
+            self._canon.popitem(last=False)
+        return blocks
+
+    def clip(self, text: str, max_tokens: int) -> str:
+        """Truncate free text to about max_tokens following the truncation policy"""
+        max_chars = max_tokens * 4
+        if len(text) <= max_chars:
+            return text
+        self.truncated += 1
+        if self.truncation == "head":
+            return text[:max_chars] + " …"
+        if self.truncation == "tail":
+            return "… " + text[-max_chars:]
+        half = max_chars // 2
+        return text[:half] + " … " + text[-half:]
+
+    def fit(self, render: Callable[[int], str]) -> str:
+        """Render with the largest free-text limit whose prompt fits the token budget"""
+        limit = self.scene_text_tokens
+        prompt = render(limit)
+        while estimate_tokens(prompt) > self.budget_tokens and limit > 32:
+            limit //= 2
+            prompt = render(limit)
+        if estimate_tokens(prompt) > self.budget_tokens:
+            self.over_budget += 1
+            logger.warning(f"⚠️  Prompt still over budget after truncation ({estimate_tokens(prompt)} tokens)")
+        return prompt
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "canonCacheHits": self.canon_hits,
+            "canonCacheMisses": self.canon_misses,
+            "truncatedTexts": self.truncated,
+            "overBudgetPrompts": self.over_budget
+        }
+
+
+prompt_builder = PromptBuilder(
+    budget_tokens=int(os.environ.get("CHRONICLE_PROMPT_TOKEN_BUDGET", "2000")),
+    scene_text_tokens=int(os.environ.get("CHRONICLE_SCENE_TEXT_TOKENS", "400")),
+    truncation=os.environ.get("CHRONICLE_PROMPT_TRUNCATION", "middle")
+)
+
+FIRST_SCENE_TEMPLATE = """You are the Scene Orchestrator for Chronicle, a character story engine.
+
+{canon}
+
+Generate the FIRST SCENE introducing this character. Respond ONLY with valid JSON (no markdown, no code blocks):
+{{"sceneDescription": "2-3 sentences describing the scene", "visualPrompt": "Detailed image generation prompt maintaining canonical appearance", "emotionalState": "current emotion", "environment": "location description", "narrativeSummary": "what's happening in this moment"}}
+
+Be creative but STRICTLY honor the character canon. Output ONLY the JSON object, nothing else."""
+
+EDIT_ANALYSIS_SCHEMA = (
+    '{"isValid": true or false, '
+    '"editType": "emotion_change" or "environment_change" or "new_scene" or "visual_adjustment" or "invalid", '
+    '"rejectionReason": "why this violates canon (only if invalid)", '
+    '"constraints": ["trait1", "trait2"], '
+    '"changes": {"emotionalState": "new emotion or null", "environment": "new environment or null", '
+    '"visualAdjustments": "changes to appearance/lighting/pose"}, '
+    '"narrativeDelta": "what changed in the story"}'
+)
+
+EDIT_TEMPLATE = """You are the Edit Parser for Chronicle. Analyze this edit command.
+
+{canon}
+
+CURRENT SCENE:
+{scene}
+Emotional State: {emotional_state}
+Environment: {environment}
+
+USER EDIT COMMAND: "{command}"
+
+Respond ONLY with valid JSON (no markdown, no code blocks):
+{schema}
+
+{rules}
+
+Output ONLY the JSON object, nothing else."""
+
+EDIT_BATCH_TEMPLATE = """You are the Edit Parser for Chronicle. Analyze each of these edit commands on its own against the same scene.
+
+{canon}
+
+CURRENT SCENE:
+{scene}
+Emotional State: {emotional_state}
+Environment: {environment}
+
+USER EDIT COMMANDS ({count}):
+{commands}
+
+Respond ONLY with a valid JSON array (no markdown, no code blocks) holding exactly one object per command, in the same order:
+[{schema}, ...]
+
+{rules}
+
+Output ONLY the JSON array, nothing else."""
+
+EVOLVE_TEMPLATE = """Apply this edit to create an EVOLVED scene (not a reset).
+
+{canon}
+
+PREVIOUS SCENE:
+{scene}
+{related}
+APPROVED CHANGES: {changes}
+Narrative Delta: {delta}
+
+Respond ONLY with valid JSON for the UPDATED scene (no markdown, no code blocks):
+{{"sceneDescription": "evolved 2-3 sentences", "visualPrompt": "updated visual maintaining character canon", "emotionalState": {emotional_state}, "environment": {environment}, "narrativeSummary": "what changed"}}
+
+Output ONLY the JSON object, nothing else."""
+
+
+def first_scene_prompt(character: Character) -> str:
+    return FIRST_SCENE_TEMPLATE.format(canon=prompt_builder.canon(character).full)
+
+
+def edit_prompt(character: Character, current_scene: SceneRecord, command: str) -> str:
+    canon = prompt_builder.canon(character)
+    return prompt_builder.fit(lambda limit: EDIT_TEMPLATE.format(
+        canon=canon.edit,
+        scene=prompt_builder.clip(current_scene.sceneDescription, limit),
+        emotional_state=current_scene.emotionalState,
+        environment=current_scene.environment,
+        command=prompt_builder.clip(command, limit),
+        schema=EDIT_ANALYSIS_SCHEMA,
+        rules=canon.edit_rules
+    ))
+
+
+def edit_batch_prompt(character: Character, current_scene: SceneRecord, commands: List[str]) -> str:
+    canon = prompt_builder.canon(character)
+    return prompt_builder.fit(lambda limit: EDIT_BATCH_TEMPLATE.format(
+        canon=canon.edit,
+        scene=prompt_builder.clip(current_scene.sceneDescription, limit),
+        emotional_state=current_scene.emotionalState,
+        environment=current_scene.environment,
+        count=len(commands),
+        commands="\n".join(
+            f'{n}. "{prompt_builder.clip(command, limit)}"' for n, command in enumerate(commands, start=1)
+        ),
+        schema=EDIT_ANALYSIS_SCHEMA,
+        rules=canon.edit_rules
+    ))
+
+
+def related_scenes_block(heading: str, scenes: List[SceneRecord], limit: int) -> str:
+    """Retrieved scenes in story order as a prompt section, each clipped to a quarter of the free-text limit"""
+    if not scenes:
+        return ""
+    lines = "\n".join(
+        f"Scene {s.sceneNumber}: {prompt_builder.clip(scene_text(s), max(limit // 4, 16))}"
+        for s in sorted(scenes, key=lambda s: s.sceneNumber)
+    )
+    return f"\n{heading}:\n{lines}\n"
+
+
+async def evolve_prompt(character: Character, current_scene: SceneRecord, edit_analysis: EditAnalysis) -> str:
+    changes = {k: v for k, v in edit_analysis.changes.items() if v not in (None, "")}
+    # Earlier scenes that share the edit's people, places and objects, beyond the immediate previous one
+    related = await scene_retriever.related(
+        character.id,
+        " ".join([edit_analysis.narrativeDelta, *(str(v) for v in changes.values())]),
+        exclude={current_scene.id}
+    )
+    return prompt_builder.fit(lambda limit: EVOLVE_TEMPLATE.format(
+        canon=prompt_builder.canon(character).short,
+        scene=prompt_builder.clip(current_scene.sceneDescription, limit),
+        related=related_scenes_block("RELATED EARLIER SCENES (stay consistent with them)", related, limit),
+        changes=json.dumps(changes, separators=(",", ":")),
+        delta=prompt_builder.clip(edit_analysis.narrativeDelta, limit),
+        emotional_state=json.dumps(edit_analysis.changes.get('emotionalState') or current_scene.emotionalState),
+        environment=json.dumps(edit_analysis.changes.get('environment') or current_scene.environment)
+    ))
+
+# ============================================================================
+# AI ORCHESTRATION FUNCTIONS
+# ============================================================================
+
+class TokenUsage:
+    """Model calls and input/output tokens per endpoint and orchestration task"""
+
+    def __init__(self):
+        self.usage: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    def record(self, task: str, input_tokens: int, output_tokens: int) -> None:
+        by_task = self.usage.setdefault(current_endpoint.get(), {})
+        counts = by_task.setdefault(task, {"calls": 0, "inputTokens": 0, "outputTokens": 0})
+        counts["calls"] += 1
+        counts["inputTokens"] += input_tokens
+        counts["outputTokens"] += output_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return self.usage
+
+
+token_usage = TokenUsage()
+
+
+@contextmanager
+def timed_llm_call(task: str, queued: float):
+    """Record queue wait, latency and outcome of a model call that was requested at `queued`"""
+    started = time.perf_counter()
+    llm_queue_seconds.observe(started - queued, task=task)
+    llm_in_flight.inc(task=task)
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        llm_in_flight.dec(task=task)
+        finished = time.perf_counter()
+        llm_call_seconds.observe(finished - started, task=task, outcome=outcome)
+        record_phase(f"llm_{task}", finished - queued)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one.
+
+    The first caller for a key starts the call; callers arriving while it is
+    in flight await the same task and get its result or exception. The call
+    is cancelled only once every caller waiting on it has been cancelled,
+    and the key is forgotten when it is cancelled or completes (caching results is the
+    edit cache's job).
+    """
+
+    class _Flight:
+        __slots__ = ("task", "waiters")
+
+        def __init__(self, task: "asyncio.Task"):
+            self.task = task
+            self.waiters = 0
+
+    def __init__(self):
+        self._flights: Dict[Tuple[str, str], "SingleFlight._Flight"] = {}
+        self.started: Dict[str, int] = {}
+        self.coalesced: Dict[str, int] = {}
+
+    async def do(self, key: Tuple[str, str], call: Callable[[], Any]) -> Any:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = self._Flight(asyncio.ensure_future(call()))
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.started[key[0]] = self.started.get(key[0], 0) + 1
+        else:
+            self.coalesced[key[0]] = self.coalesced.get(key[0], 0) + 1
+        
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Forget it now rather than in the done-callback, so a caller
+                # arriving before the cancellation lands starts a fresh call
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def _forget(self, key: Tuple[str, str], flight: "SingleFlight._Flight") -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            # Retrieved by the waiters; avoids "exception was never retrieved" once they are gone
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inFlight": len(self._flights),
+            "started": self.started,
+            "coalesced": self.coalesced
+        }
+
+
+# "on" lets concurrent identical prompts (same task and text) share one model call
+single_flight_enabled = os.environ.get("CHRONICLE_SINGLE_FLIGHT", "on") == "on"
+model_calls = SingleFlight()
+
+
+async def generate_content(prompt: str, task: str) -> ModelResponse:
+    """Send a prompt to the model provider through the admission queue, retrying transient errors.
+
+    Concurrent calls with the same task and prompt share one provider call
+    unless CHRONICLE_SINGLE_FLIGHT is off.
+    """
+    if single_flight_enabled:
+        return await model_calls.do((task, prompt), lambda: _generate_content(prompt, task))
+    return await _generate_content(prompt, task)
+
+
+def retry_or_raise(task: str, attempt: int, error: Exception) -> float:
+    """Backoff before retrying a failed model call; re-raises once retries are spent.
+
+    A quota error that outlasts the retries surfaces as a 429 so clients back
+    off instead of seeing a generic failure.
+    """
+    if not model_provider.is_transient(error):
+        raise error
+    if attempt >= llm_retry_limit:
+        if model_provider.is_quota_error(error):
+            raise AdmissionRejected(admission.retry_after(), "Model quota exhausted, retry shortly") from error
+        raise error
+    llm_retries.inc(task=task)
+    delay = retry_delay(attempt)
+    logger.warning(f"🔁 {task} call failed ({error}); retry {attempt + 1}/{llm_retry_limit} in {delay:.2f}s")
+    return delay
+
+
+async def _generate_content(prompt: str, task: str) -> ModelResponse:
+    attempt = 0
+    while True:
+        queued = time.perf_counter()
+        try:
+            async with admission.slot(task):
+                with timed_llm_call(task, queued):
+                    response = await model_provider.generate(prompt, task)
+            break
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            # Sleep outside the slot so the backoff doesn't hold capacity
+            await asyncio.sleep(retry_or_raise(task, attempt, e))
+            attempt += 1
+    token_usage.record(
+        task,
+        response.input_tokens or estimate_tokens(prompt),
+        response.output_tokens or estimate_tokens(response.text)
+    )
+    return response
+
+
+async def stream_content(prompt: str, task: str) -> AsyncIterator[str]:
+    """Streaming generate_content: yields response text chunks as the provider produces them.
+
+    Transient failures are retried only until the first chunk has been
+    yielded; after that the caller has partial output and the error propagates.
+    """
+    output_chars = 0
+    attempt = 0
+    while True:
+        queued = time.perf_counter()
+        try:
+            async with admission.slot(task):
+                with timed_llm_call(task, queued):
+                    async for chunk in model_provider.stream(prompt, task):
+                        output_chars += len(chunk)
+                        yield chunk
+            break
+        except AdmissionRejected:
+            raise
+        except Exception as e:
+            if output_chars:
+                raise
+            await asyncio.sleep(retry_or_raise(task, attempt, e))
+            attempt += 1
+    token_usage.record(task, estimate_tokens(prompt), (output_chars + 3) // 4)
+
+
+class JSONExtractionError(ValueError):
+    """Model output did not contain a usable JSON value"""
+
+
+_json_decoder = json.JSONDecoder()
+
+
+def extract_json(text: str, opener: str = "{") -> Any:
+    """Parse the first balanced JSON object (or array, with opener="[") in model output.
+
+    Prose and markdown fences around the JSON are skipped by decoding in
+    place from each candidate opener with raw_decode, so the response text
+    is never sliced, cleaned or copied.
+    """
+    index = text.find(opener)
+    while index != -1:
+        try:
+            return _json_decoder.raw_decode(text, index)[0]
+        except json.JSONDecodeError:
+            index = text.find(opener, index + 1)
+    raise JSONExtractionError(f"No valid JSON {'array' if opener == '[' else 'object'} in model output")
+
+
+def parse_scene_data(text: str) -> Dict[str, Any]:
+    return SceneContent.model_validate(extract_json(text)).model_dump()
+
+
+def parse_edit_analysis(text: str) -> EditAnalysis:
+    return EditAnalysis.model_validate(extract_json(text))
+
+
+def parse_edit_analyses(text: str, expected: int) -> List[EditAnalysis]:
+    analyses = [EditAnalysis.model_validate(item) for item in extract_json(text, "[")]
+    if len(analyses) != expected:
+        raise JSONExtractionError(f"Expected {expected} edit analyses, got {len(analyses)}")
+    return analyses
+
+
+class JSONParseStats:
+    """Per-task counters for parsing model output and repairing it"""
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def count(self, task: str, outcome: str) -> None:
+        counts = self.counts.setdefault(task, {"parsed": 0, "failed": 0, "repaired": 0, "unrecoverable": 0})
+        counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            task: {**counts, "failureRate": counts["failed"] / max(1, counts["parsed"] + counts["failed"])}
+            for task, counts in self.counts.items()
+        }
+
+
+json_parse_stats = JSONParseStats()
+
+# Cheap "fix this JSON" follow-ups allowed per response before the request fails
+json_repair_attempts = int(os.environ.get("CHRONICLE_JSON_REPAIR_ATTEMPTS", "1"))
+
+
+def json_repair_prompt(text: str, error: Exception) -> str:
+    return f"""The text below was supposed to be valid JSON but could not be used: {error}
+
+{text[:4000]}
+
+Return ONLY the corrected JSON with the same fields and content (no markdown, no code blocks, no commentary)."""
+
+
+async def parse_model_output(text: str, task: str, parser: Callable[[str], T]) -> T:
+    """Parse model output, sending up to json_repair_attempts short repair prompts on failure"""
+    for attempt in range(json_repair_attempts + 1):
+        try:
+            value = parser(text)
+        except (ValueError, ValidationError) as e:
+            json_parse_stats.count(task, "failed")
+            if attempt == json_repair_attempts:
+                json_parse_stats.count(task, "unrecoverable")
+                raise
+            logger.warning(f"⚠️  Unparseable {task} output ({e.__class__.__name__}), asking the model to repair it")
+            text = (await generate_content(json_repair_prompt(text, e), task)).text
+            continue
+        json_parse_stats.count(task, "repaired" if attempt else "parsed")
+        return value
+
+
+async def generate_parsed(prompt: str, task: str, parser: Callable[[str], T]) -> T:
+    """generate_content followed by parse_model_output"""
+    response = await generate_content(prompt, task)
+    return await parse_model_output(response.text, task, parser)
+
+
+SCENE_FIELDS = ("sceneDescription", "visualPrompt", "emotionalState", "environment", "narrativeSummary")
+_SCENE_FIELD_PATTERN = re.compile(
+    r'"(' + "|".join(SCENE_FIELDS) + r')"\s*:\s*"((?:[^"\\]|\\.)*)"'
+)
+
+
+async def _stream_scene_fields(prompt: str, task: str) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield ("field", {"field", "value"}) as each scene string field completes, then ("data", dict)"""
+    text = ""
+    emitted = set()
+    async for chunk in stream_content(prompt, task):
+        text += chunk
+        for match in _SCENE_FIELD_PATTERN.finditer(text):
+            field = match.group(1)
+            if field not in emitted:
+                emitted.add(field)
+                yield ("field", {"field": field, "value": json.loads(f'"{match.group(2)}"')})
+    
+    yield ("data", await parse_model_output(text, task, parse_scene_data))
+
+
+def build_first_scene(character: Character, scene_data: Dict[str, Any]) -> SceneRecord:
+    """A first scene, numbered and placed on a branch by store.append_scene"""
+    return SceneRecord(
+        id=id_generator.new_id("scene"),
+        characterId=character.id,
+        sceneNumber=0,
+        sceneDescription=scene_data["sceneDescription"],
+        visualPrompt=scene_data["visualPrompt"],
+        emotionalState=scene_data["emotionalState"],
+        environment=scene_data["environment"],
+        narrativeSummary=scene_data["narrativeSummary"],
+        timestamp=datetime.now().isoformat()
+    )
+
+
+async def generate_first_scene(character: Character) -> SceneRecord:
+    """Generate initial scene for a new character using Gemini"""
+    
+    logger.info(f"🤖 Calling Gemini API to generate first scene for character: {character.name}")
+    
+    scene_data = await generate_parsed(first_scene_prompt(character), "scene", parse_scene_data)
+    
+    logger.info(f"✅ Gemini API response received - First scene generated successfully")
+    
+    return build_first_scene(character, scene_data)
+
+
+async def stream_first_scene(character: Character) -> AsyncIterator[Tuple[str, Any]]:
+    """Streaming generate_first_scene: yields ("field", {...}) per completed field, then ("scene", Scene)"""
+    
+    logger.info(f"🤖 Streaming first scene from Gemini API for character: {character.name}")
+    
+    async for event in _stream_scene_fields(first_scene_prompt(character), "scene"):
+        if event[0] == "field":
+            yield event
+        else:
+            yield ("scene", build_first_scene(character, event[1]))
+
+
+def count_verdict(source: str, edit_analysis: EditAnalysis) -> None:
+    edit_verdicts.inc(source=source, verdict="approved" if edit_analysis.isValid else "rejected")
+
+
+async def local_edit_verdict(
+    character: Character,
+    current_scene: SceneRecord,
+    command: str
+) -> Tuple[Optional[EditAnalysis], Optional[str]]:
+    """Answer an edit from the pre-filter or the edit cache, without the model.
+
+    Returns (analysis or None, edit cache key to store the model's answer under).
+    """
+    
+    local_verdict = edit_prefilter.check(character, command)
+    if local_verdict is not None:
+        logger.info(f"⚡ Edit answered locally ({'APPROVED' if local_verdict.isValid else 'REJECTED'}): '{command}'")
+        count_verdict("prefilter", local_verdict)
+        return local_verdict, None
+    
+    cache_key = edit_cache_key(character, current_scene, command) if edit_cache.enabled else None
+    if cache_key:
+        cached = await edit_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Edit parse cache hit for command: '{command}'")
+            count_verdict("cache", cached)
+            return cached, cache_key
+    
+    return None, cache_key
+
+
+async def parse_edit_command(character: Character, current_scene: SceneRecord, command: str) -> EditAnalysis:
+    """Parse natural language edit command and validate against character canon"""
+    
+    edit_analysis, cache_key = await local_edit_verdict(character, current_scene, command)
+    if edit_analysis is not None:
+        return edit_analysis
+    return await model_edit_verdict(character, current_scene, command, cache_key)
+
+
+async def model_edit_verdict(
+    character: Character,
+    current_scene: SceneRecord,
+    command: str,
+    cache_key: Optional[str]
+) -> EditAnalysis:
+    """Ask the model to parse and validate an edit command, caching the answer under cache_key"""
+    
+    logger.info(f"🤖 Calling Gemini API to PARSE edit command: '{command}'")
+    
+    prompt = edit_prompt(character, current_scene, command)
+
+    edit_analysis = await generate_parsed(prompt, "edit", parse_edit_analysis)
+    if cache_key:
+        await edit_cache.put(cache_key, edit_analysis)
+    count_verdict("model", edit_analysis)
+    
+    if edit_analysis.isValid:
+        logger.info(f"✅ Edit APPROVED - Type: {edit_analysis.editType}")
+    else:
+        logger.warning(f"❌ Edit REJECTED - Reason: {edit_analysis.rejectionReason}")
+    
+    return edit_analysis
+
+
+async def parse_edit_commands(character: Character, current_scene: SceneRecord, commands: List[str]) -> List[EditAnalysis]:
+    """Validate several edit commands against the same scene with one model call.
+
+    Commands the local pre-filter or the edit cache can answer skip the
+    model; the rest go into a single prompt that returns one analysis per
+    command, in order.
+    """
+    
+    analyses: List[Optional[EditAnalysis]] = [edit_prefilter.check(character, command) for command in commands]
+    for analysis in analyses:
+        if analysis is not None:
+            count_verdict("prefilter", analysis)
+    keys = [
+        edit_cache_key(character, current_scene, command) if edit_cache.enabled and analysis is None else None
+        for command, analysis in zip(commands, analyses)
+    ]
+    for i, key in enumerate(keys):
+        if key:
+            analyses[i] = await edit_cache.get(key)
+            if analyses[i] is not None:
+                count_verdict("cache", analyses[i])
+    pending = [i for i, analysis in enumerate(analyses) if analysis is None]
+    if not pending:
+        logger.info(f"⚡ All {len(commands)} batched commands answered locally or from cache")
+        return analyses
+    
+    logger.info(f"🤖 Calling Gemini API to PARSE {len(pending)} batched edit commands")
+    
+    prompt = edit_batch_prompt(character, current_scene, [commands[i] for i in pending])
+
+    try:
+        batch = await generate_parsed(prompt, "edit_batch", lambda text: parse_edit_analyses(text, len(pending)))
+    except (JSONExtractionError, ValidationError) as e:
+        # One missing or extra item would otherwise fail every command of the batch
+        logger.warning(f"⚠️  Batched edit answer unusable ({e}), parsing {len(pending)} commands one by one")
+        batch = await asyncio.gather(*(
+            model_edit_verdict(character, current_scene, commands[i], keys[i]) for i in pending
+        ))
+        for i, edit_analysis in zip(pending, batch):
+            analyses[i] = edit_analysis
+        return analyses
     
-    logger.info(f"✅ Gemini API response received - First scene generated successfully")
+    for i, edit_analysis in zip(pending, batch):
+        analyses[i] = edit_analysis
+        if keys[i]:
+            await edit_cache.put(keys[i], analyses[i])
+        count_verdict("model", edit_analysis)
     
-    response_text = response.text
-    # Clean JSON from markdown code blocks if present
-    clean_json = response_text.replace("```json", "").replace("```", "").strip()
-    scene_data = json.loads(clean_json)
+    approved = sum(1 for analysis in analyses if analysis.isValid)
+    logger.info(f"✅ Batched edits parsed - {approved} approved, {len(analyses) - approved} rejected")
     
-    # Create scene object
-    scene_id = f"scene_{int(datetime.now().timestamp() * 1000)}"
-    scene = Scene(
-        id=scene_id,
+    return analyses
+
+
+def build_evolved_scene(
+    character: Character,
+    current_scene: SceneRecord,
+    edit_analysis: EditAnalysis,
+    scene_data: Dict[str, Any]
+) -> SceneRecord:
+    """A scene continuing current_scene, numbered and placed on a branch by store.append_scene.
+
+    Continuing the last scene of a branch extends it, continuing an older scene forks.
+    """
+    return SceneRecord(
+        id=id_generator.new_id("scene"),
         characterId=character.id,
-        sceneNumber=1,
+        sceneNumber=0,
         sceneDescription=scene_data["sceneDescription"],
         visualPrompt=scene_data["visualPrompt"],
         emotionalState=scene_data["emotionalState"],
         environment=scene_data["environment"],
         narrativeSummary=scene_data["narrativeSummary"],
         timestamp=datetime.now().isoformat(),
-        edits=[]
+        edits=(EditRecord(
+            command=edit_analysis.narrativeDelta,
+            editType=edit_analysis.editType,
+            timestamp=datetime.now().isoformat()
+        ),),
+        previousSceneId=current_scene.id
     )
-    
-    return scene
 
 
-def parse_edit_command(character: Character, current_scene: Scene, command: str) -> EditAnalysis:
-    """Parse natural language edit command and validate against character canon"""
+async def generate_evolved_scene(
+    character: Character,
+    current_scene: SceneRecord,
+    edit_analysis: EditAnalysis
+) -> SceneRecord:
+    """Generate evolved scene based on approved edit"""
     
-    logger.info(f"🤖 Calling Gemini API to PARSE edit command: '{command}'")
+    logger.info(f"🤖 Calling Gemini API to GENERATE evolved scene (edit type: {edit_analysis.editType})")
+    
+    prompt = await evolve_prompt(character, current_scene, edit_analysis)
+    scene_data = await generate_parsed(prompt, "evolve", parse_scene_data)
+    
+    logger.info(f"✅ Gemini API response received - Evolved scene generated successfully")
     
-    prompt = f"""You are the Edit Parser for Chronicle. Analyze this edit command.
+    return build_evolved_scene(character, current_scene, edit_analysis, scene_data)
 
-CHARACTER CANON (IMMUTABLE):
-Name: {character.name}
-Appearance: {character.canonicalAppearance}
-Personality: {character.personality}
-Immutable Traits: {', '.join(character.immutableTraits)}
 
-CURRENT SCENE:
-{current_scene.sceneDescription}
-Emotional State: {current_scene.emotionalState}
-Environment: {current_scene.environment}
+# "on" starts evolving the scene from the raw command while the model validates it
+speculative_evolve = os.environ.get("CHRONICLE_SPECULATIVE_EVOLVE", "off") == "on"
 
-USER EDIT COMMAND: "{command}"
 
-Respond ONLY with valid JSON (no markdown, no code blocks):
+class SpeculationStats:
+    """Outcomes of speculative evolves: latency saved when used, tokens spent when not"""
 
-{{
-  "isValid": true or false,
-  "editType": "emotion_change" or "environment_change" or "new_scene" or "visual_adjustment" or "invalid",
-  "rejectionReason": "why this violates canon (only if invalid)",
-  "constraints": ["trait1", "trait2"],
-  "changes": {{
-    "emotionalState": "new emotion or null",
-    "environment": "new environment or null",
-    "visualAdjustments": "changes to appearance/lighting/pose"
-  }},
-  "narrativeDelta": "what changed in the story"
-}}
-
-REJECT edits that:
-- Change immutable traits ({', '.join(character.immutableTraits)})
-- Violate core personality
-- Contradict canonical appearance
+    def __init__(self):
+        self.outcomes: Dict[str, int] = {"used": 0, "discarded": 0, "cancelled": 0, "failed": 0}
+        self.seconds_saved = 0.0
+        self.wasted_tokens = 0
+
+    def record(self, outcome: str, seconds_saved: float = 0.0, wasted_tokens: int = 0) -> None:
+        self.outcomes[outcome] += 1
+        self.wasted_tokens += wasted_tokens
+        if outcome == "used":
+            self.seconds_saved += max(0.0, seconds_saved)
+            speculative_seconds_saved.observe(max(0.0, seconds_saved))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.outcomes,
+            "secondsSaved": round(self.seconds_saved, 3),
+            "wastedTokens": self.wasted_tokens
+        }
 
-Output ONLY the JSON object, nothing else."""
 
-    response = model.generate_content(prompt)
+speculation_stats = SpeculationStats()
+
+
+async def _timed(awaitable: Any) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - start
+
+
+async def speculative_edit(
+    character: Character,
+    current_scene: SceneRecord,
+    command: str
+) -> Tuple[EditAnalysis, Optional[SceneRecord]]:
+    """parse_edit_command and generate_evolved_scene with the two model calls overlapped.
+
+    Edits answered by the pre-filter or the cache run as usual. Otherwise
+    the scene is evolved from the raw command while the model validates it;
+    an approved edit keeps that scene (with the approved emotional state and
+    environment applied), a rejected edit cancels or discards it.
+    Returns (analysis, evolved scene or None if rejected).
+    """
+    
+    edit_analysis, cache_key = await local_edit_verdict(character, current_scene, command)
+    if edit_analysis is not None:
+        if not edit_analysis.isValid:
+            return edit_analysis, None
+        return edit_analysis, await generate_evolved_scene(character, current_scene, edit_analysis)
     
-    response_text = response.text
-    clean_json = response_text.replace("```json", "").replace("```", "").strip()
-    edit_data = json.loads(clean_json)
+    provisional = EditAnalysis(
+        isValid=True,
+        editType="pending",
+        constraints=list(character.immutableTraits),
+        changes={},
+        narrativeDelta=command
+    )
+    prompt = await evolve_prompt(character, current_scene, provisional)
+    logger.info(f"🔮 Speculatively evolving scene while the edit is validated: '{command}'")
+    started = time.perf_counter()
+    evolution = asyncio.create_task(_timed(generate_parsed(prompt, "evolve", parse_scene_data)))
+    try:
+        edit_analysis, parse_seconds = await _timed(model_edit_verdict(character, current_scene, command, cache_key))
+    except BaseException:
+        evolution.cancel()
+        raise
     
-    edit_analysis = EditAnalysis(**edit_data)
+    if not edit_analysis.isValid:
+        if not evolution.done():
+            evolution.cancel()
+            # Input tokens are likely billed even when the answer is abandoned
+            speculation_stats.record("cancelled", wasted_tokens=estimate_tokens(prompt))
+        elif evolution.exception() is not None:
+            speculation_stats.record("failed", wasted_tokens=estimate_tokens(prompt))
+        else:
+            scene_data, _ = evolution.result()
+            speculation_stats.record(
+                "discarded",
+                wasted_tokens=estimate_tokens(prompt) + estimate_tokens(json.dumps(scene_data))
+            )
+        return edit_analysis, None
     
-    if edit_analysis.isValid:
-        logger.info(f"✅ Edit APPROVED - Type: {edit_analysis.editType}")
-    else:
-        logger.warning(f"❌ Edit REJECTED - Reason: {edit_analysis.rejectionReason}")
+    try:
+        scene_data, evolve_seconds = await evolution
+    except Exception as e:
+        logger.warning(f"⚠️  Speculative evolve failed, evolving again from the approved edit: {e}")
+        speculation_stats.record("failed", wasted_tokens=estimate_tokens(prompt))
+        return edit_analysis, await generate_evolved_scene(character, current_scene, edit_analysis)
     
-    return edit_analysis
+    speculation_stats.record("used", seconds_saved=parse_seconds + evolve_seconds - (time.perf_counter() - started))
+    for field in ("emotionalState", "environment"):
+        if edit_analysis.changes.get(field):
+            scene_data[field] = edit_analysis.changes[field]
+    return edit_analysis, build_evolved_scene(character, current_scene, edit_analysis, scene_data)
 
 
-def generate_evolved_scene(
+async def stream_evolved_scene(
     character: Character,
-    current_scene: Scene,
+    current_scene: SceneRecord,
     edit_analysis: EditAnalysis
-) -> Scene:
-    """Generate evolved scene based on approved edit"""
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Streaming generate_evolved_scene: yields ("field", {...}) per completed field, then ("scene", Scene)"""
     
-    logger.info(f"🤖 Calling Gemini API to GENERATE evolved scene (edit type: {edit_analysis.editType})")
+    logger.info(f"🤖 Streaming evolved scene from Gemini API (edit type: {edit_analysis.editType})")
     
-    prompt = f"""Apply this edit to create an EVOLVED scene (not a reset).
+    prompt = await evolve_prompt(character, current_scene, edit_analysis)
+    async for event in _stream_scene_fields(prompt, "evolve"):
+        if event[0] == "field":
+            yield event
+        else:
+            yield ("scene", build_evolved_scene(character, current_scene, edit_analysis, event[1]))
 
-CHARACTER CANON: {character.name} - {character.canonicalAppearance}
 
-PREVIOUS SCENE:
-{current_scene.sceneDescription}
+def _journey_text(scenes: List[SceneRecord]) -> str:
+    return "\n".join([
+        f"Scene {s.sceneNumber}: {s.sceneDescription}"
+        for s in sorted(scenes, key=lambda x: x.sceneNumber)
+    ])
 
-APPROVED CHANGES:
-{json.dumps(edit_analysis.changes, indent=2)}
 
-Narrative Delta: {edit_analysis.narrativeDelta}
+async def summarize_scene_chunk(character: Character, scenes: List[SceneRecord]) -> str:
+    """Summarize one chunk of scenes for hierarchical recaps"""
+    
+    prompt = f"""Summarize this part of a character's journey.
 
-Respond ONLY with valid JSON for the UPDATED scene (no markdown, no code blocks):
+CHARACTER: {character.name}
+SCENES {scenes[0].sceneNumber}-{scenes[-1].sceneNumber}:
+{_journey_text(scenes)}
 
-{{
-  "sceneDescription": "evolved 2-3 sentences",
-  "visualPrompt": "updated visual maintaining character canon",
-  "emotionalState": "{edit_analysis.changes.get('emotionalState') or current_scene.emotionalState}",
-  "environment": "{edit_analysis.changes.get('environment') or current_scene.environment}",
-  "narrativeSummary": "what changed"
-}}
+Provide a 2-sentence summary of what happens to the character in these scenes."""
 
-Output ONLY the JSON object, nothing else."""
+    response = await generate_content(prompt, "recap")
+    return response.text.strip()
 
-    response = model.generate_content(prompt)
+
+async def generate_memory_recap(character: Character) -> str:
+    """Generate AI-powered memory recap of character's journey.
+
+    Recaps are incremental: the rolling summary stored for the character is
+    returned as-is, without reading any scene, while the character's
+    history_version is the one it was written at. Otherwise only the scenes
+    after the last sceneNumber it covers are read and folded into it (a
+    rewritten scene drops the stored recap). More than recap_chunk_size new
+    scenes are first summarized chunk by chunk, in parallel.
+    """
     
-    logger.info(f"✅ Gemini API response received - Evolved scene generated successfully")
+    state = await run_store(store.get_recap, character.id)
+    version = await run_store(store.history_version, character.id)
+    if state and state.version == version:
+        logger.info(f"⚡ Memory recap for {character.name} unchanged since last call ({state.scene_count} scenes)")
+        return state.summary
     
-    response_text = response.text
-    clean_json = response_text.replace("```json", "").replace("```", "").strip()
-    scene_data = json.loads(clean_json)
+    new_scenes = await run_store(store.scene_page, character.id, state.last_number if state else 0)
+    if state and state.scene_count + len(new_scenes) != await run_store(store.scene_count, character.id):
+        # A scene was stored below the covered sceneNumber (concurrent edits): fold everything again
+        state = None
+        new_scenes = await run_store(store.character_scenes, character.id)
+    covered = state.scene_count if state else 0
+    scene_count = covered + len(new_scenes)
     
-    # Get next scene number
-    character_scenes = [s for s in scenes_db.values() if s.characterId == character.id]
-    next_scene_number = len(character_scenes) + 1
+    if not new_scenes:
+        if state is None:
+            return "No scenes yet to generate a recap."
+        # Written to by another character's delete or rewrite only (SQLite versions), nothing new here
+        await run_store(store.save_recap, character.id, RecapState(state.summary, version, state.last_number, covered))
+        return state.summary
     
-    # Create new scene
-    scene_id = f"scene_{int(datetime.now().timestamp() * 1000)}"
-    new_scene = Scene(
-        id=scene_id,
-        characterId=character.id,
-        sceneNumber=next_scene_number,
-        sceneDescription=scene_data["sceneDescription"],
-        visualPrompt=scene_data["visualPrompt"],
-        emotionalState=scene_data["emotionalState"],
-        environment=scene_data["environment"],
-        narrativeSummary=scene_data["narrativeSummary"],
-        timestamp=datetime.now().isoformat(),
-        edits=[{
-            "command": edit_analysis.narrativeDelta,
-            "editType": edit_analysis.editType,
-            "timestamp": datetime.now().isoformat()
-        }],
-        previousSceneId=current_scene.id
+    logger.info(
+        f"🤖 Calling Gemini API to generate memory recap for {character.name} "
+        f"({len(new_scenes)} new of {scene_count} scenes)"
     )
     
-    return new_scene
+    if len(new_scenes) > recap_chunk_size:
+        chunks = [
+            new_scenes[i:i + recap_chunk_size]
+            for i in range(0, len(new_scenes), recap_chunk_size)
+        ]
+        summaries = await asyncio.gather(*(summarize_scene_chunk(character, chunk) for chunk in chunks))
+        new_material = "\n".join(
+            f"Scenes {chunk[0].sceneNumber}-{chunk[-1].sceneNumber}: {summary}"
+            for chunk, summary in zip(chunks, summaries)
+        )
+    else:
+        new_material = _journey_text(new_scenes)
+    
+    if state:
+        # Older scenes the new ones pick up on, which the rolling summary may have compressed away
+        new_ids = {s.id for s in new_scenes}
+        related = await scene_retriever.related(
+            character.id, " ".join(scene_text(s) for s in new_scenes[-recap_chunk_size:]), exclude=new_ids
+        )
+        earlier = related_scenes_block(
+            "Earlier scenes the new ones pick up on", [s for s in related if s.sceneNumber <= state.last_number],
+            prompt_builder.scene_text_tokens
+        )
+        prompt = f"""Update the memory recap for this character's journey.
 
+CHARACTER: {character.name}
+SCENES: {scene_count}
 
-def generate_memory_recap(character: Character, scenes: List[Scene]) -> str:
-    """Generate AI-powered memory recap of character's journey"""
-    
-    logger.info(f"🤖 Calling Gemini API to generate memory recap for {character.name} ({len(scenes)} scenes)")
-    
-    journey_text = "\n".join([
-        f"Scene {s.sceneNumber}: {s.sceneDescription}"
-        for s in sorted(scenes, key=lambda x: x.sceneNumber)
-    ])
-    
-    prompt = f"""Generate a memory recap for this character's journey.
+Recap so far ({covered} scenes):
+{state.summary}
+{earlier}
+New in the journey:
+{new_material}
+
+Provide a 3-sentence narrative summary of the character's emotional and physical journey, including what is new."""
+    else:
+        prompt = f"""Generate a memory recap for this character's journey.
 
 CHARACTER: {character.name}
-SCENES: {len(scenes)}
+SCENES: {scene_count}
 
 Journey:
-{journey_text}
+{new_material}
 
 Provide a 3-sentence narrative summary of the character's emotional and physical journey."""
 
-    response = model.generate_content(prompt)
+    response = await generate_content(prompt, "recap")
     
     logger.info(f"✅ Memory recap generated successfully")
     
+    await run_store(store.save_recap, character.id, RecapState(
+        summary=response.text,
+        version=version,
+        last_number=max(s.sceneNumber for s in new_scenes),
+        scene_count=scene_count
+    ))
     return response.text
 
 
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+# Jobs run concurrently per worker process
+job_workers = int(os.environ.get("CHRONICLE_JOB_WORKERS", "4"))
+# Attempts per job before it is marked failed
+job_max_attempts = int(os.environ.get("CHRONICLE_JOB_ATTEMPTS", "4"))
+# First backoff between attempts, doubled per attempt
+job_retry_base = float(os.environ.get("CHRONICLE_JOB_RETRY_BASE", "2"))
+# Seconds a running job is reserved for its worker before another worker may take it over
+job_lease_seconds = float(os.environ.get("CHRONICLE_JOB_LEASE", "300"))
+
+
+class JobError(Exception):
+    """A job failure that retrying cannot fix"""
+
+
+async def run_first_scene_job(job: Job) -> Dict[str, Any]:
+    character = await run_store(store.get_character, job.character_id)
+    if character is None:
+        raise JobError("Character not found")
+    existing = await run_store(store.scene_page, job.character_id, 0, 1)
+    if existing:
+        # Already generated by an earlier attempt that died before recording success
+        return {"firstScene": existing[0].to_dict()}
+    first_scene = await generate_first_scene(character)
+    if not await run_store(store.has_character, job.character_id):
+        raise JobError("Character was deleted while its first scene was generated")
+    await run_store(store.append_scene, first_scene)
+    return {"firstScene": first_scene.to_dict()}
+
+
+async def run_recap_job(job: Job) -> Dict[str, Any]:
+    character = await run_store(store.get_character, job.character_id)
+    if character is None:
+        raise JobError("Character not found")
+    return {"recap": await generate_memory_recap(character)}
+
+
+JOB_HANDLERS: Dict[str, Callable[[Job], Any]] = {
+    "first_scene": run_first_scene_job,
+    "recap": run_recap_job
+}
+
+
+class JobQueue:
+    """In-process asyncio job queue with a worker pool, persisted through the store.
+
+    Jobs are saved before they are queued and after every state change, so
+    GET /api/jobs/{id} works from any worker sharing the store, and queued
+    or abandoned jobs are picked up again when a worker starts. Workers
+    claim a job atomically before running it, and failed attempts are
+    retried with exponential backoff until job_max_attempts.
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers = workers
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[str]"] = None
+        self._tasks: List["asyncio.Task"] = []
+        # job id -> event set on its next state change, for watchers
+        self._changes: Dict[str, asyncio.Event] = {}
+
+    def start(self) -> None:
+        """Start the workers on the running event loop and queue resumable jobs"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._resume()))
+
+    async def _resume(self) -> None:
+        resumed = await run_store(store.resumable_jobs, time.time())
+        for job_id in resumed:
+            self._queue.put_nowait(job_id)
+        if resumed:
+            logger.info(f"🧵 Resumed {len(resumed)} background jobs")
+
+    async def submit(self, kind: str, character_id: str) -> Job:
+        now = datetime.now().isoformat()
+        job = Job(id=id_generator.new_id("job"), kind=kind, character_id=character_id, created_at=now, updated_at=now)
+        await run_store(store.save_job, job)
+        self.start()
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            claimed = False
+            try:
+                job = await run_store(store.claim_job, job_id, time.time(), job_lease_seconds)
+                if job is None:
+                    # Finished, or claimed by another worker sharing the store
+                    continue
+                claimed = True
+                self._notify(job)
+                await self._run(job)
+            except Exception as e:
+                # A store error must not take the worker down with it. The job
+                # stays queued, or leased if it was claimed: try again once
+                # the lease has run out.
+                retry_in = job_lease_seconds if claimed else job_retry_base
+                logger.error(f"❌ Job worker error on {job_id}: {e}; requeued in {retry_in:.0f}s")
+                self._loop.call_later(retry_in, self._queue.put_nowait, job_id)
+
+    async def _run(self, job: Job) -> None:
+        current_endpoint.set(f"JOB {job.kind}")
+        started = time.perf_counter()
+        retry_in = None
+        try:
+            job.result = await JOB_HANDLERS[job.kind](job)
+            job.status, job.error = "succeeded", None
+        except Exception as e:
+            job.error = str(e)
+            if isinstance(e, JobError) or job.attempts >= job_max_attempts:
+                job.status = "failed"
+                logger.error(f"❌ {job.kind} job {job.id} failed after {job.attempts} attempts: {e}")
+            else:
+                job.status = "queued"
+                retry_in = retry_delay(job.attempts - 1, job_retry_base)
+                logger.warning(f"🔁 {job.kind} job {job.id} failed ({e}); attempt {job.attempts + 1} in {retry_in:.1f}s")
+        job.updated_at = datetime.now().isoformat()
+        job.lease_until = 0.0
+        await run_store(store.save_job, job)
+        outcome = "retried" if retry_in is not None else job.status
+        job_seconds.observe(time.perf_counter() - started, kind=job.kind, outcome=outcome)
+        counts = self.outcomes.setdefault(job.kind, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        self._notify(job)
+        if retry_in is not None:
+            self._loop.call_later(retry_in, self._queue.put_nowait, job.id)
+
+    def _notify(self, job: Job) -> None:
+        event = self._changes.pop(job.id, None)
+        if event is not None:
+            event.set()
+
+    async def watch(self, job_id: str, poll_seconds: float = 1.0) -> AsyncIterator[Job]:
+        """Yield the job now and after every state change until it finishes.
+
+        Changes made in this process wake the watcher at once; the store is
+        also polled every poll_seconds for jobs run by other workers.
+        """
+        last = None
+        while True:
+            job = await run_store(store.get_job, job_id)
+            if job is None:
+                return
+            state = (job.status, job.attempts)
+            if state != last:
+                last = state
+                yield job
+            if job.finished:
+                return
+            event = self._changes.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "outcomes": self.outcomes
+        }
+
+
+jobs = JobQueue(workers=job_workers)
+
+
+# ============================================================================
+# BULK IMPORT / EXPORT
+# ============================================================================
+
+# Records written per store transaction during an NDJSON import (and scenes per page during export)
+bulk_batch_size = int(os.environ.get("CHRONICLE_BULK_BATCH_SIZE", "1000"))
+
+# Longest accepted NDJSON line
+MAX_NDJSON_LINE_BYTES = 1 << 20
+
+# Line errors listed in an import summary (all of them are counted)
+MAX_IMPORT_ERRORS = 100
+
+
+def export_lines(character_ids: List[str]) -> Iterator[str]:
+    """NDJSON export: each character followed by its scenes in sceneNumber order, one page at a time"""
+    for character_id in character_ids:
+        character = store.get_character(character_id)
+        if character is None:
+            # Deleted while the export was running
+            continue
+        yield json.dumps({"type": "character", **character.model_dump()}) + "\n"
+        after = 0
+        while True:
+            page = store.scene_page(character_id, after, bulk_batch_size)
+            if not page:
+                break
+            yield "".join(json.dumps({"type": "scene", **scene.to_dict()}) + "\n" for scene in page)
+            after = page[-1].sceneNumber
+
+
+class NDJSONImporter:
+    """Validates NDJSON character and scene records line by line and writes them in batches.
+
+    Lines use the GET /api/export format. A character must be new and come
+    before its scenes; a scene must belong to a character of the same
+    import, have a higher sceneNumber than that character's previous scene
+    and continue (previousSceneId) a scene imported before it. Invalid
+    lines are reported and skipped, everything else is stored
+    bulk_batch_size records per store transaction. Exported branchId and
+    depth are ignored: the store places each scene from its previousSceneId.
+    """
+
+    def __init__(self):
+        self.line = 0
+        self.characters = 0
+        self.scenes = 0
+        self.error_count = 0
+        self.errors: List[Dict[str, Any]] = []
+        # Imported characters without a scene, for first-scene generation
+        self.sceneless: Dict[str, None] = {}
+        self._pending_characters: List[Character] = []
+        self._pending_scenes: List[SceneRecord] = []
+        # characterId -> sceneNumber of its last imported scene
+        self._last_numbers: Dict[str, int] = {}
+        # scene id -> characterId of every imported scene
+        self._scene_characters: Dict[str, str] = {}
+
+    def feed_lines(self, lines: List[bytes]) -> None:
+        for line in lines:
+            self.feed(line)
+
+    def feed(self, line: bytes) -> None:
+        self.line += 1
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            kind = record.pop("type", None)
+            if kind == "character":
+                self._add_character(Character.model_validate(record))
+            elif kind == "scene":
+                self._add_scene(SceneRecord.from_scene(Scene.model_validate(record)))
+            else:
+                raise ValueError(f"unknown record type {kind!r}, expected 'character' or 'scene'")
+        except ValidationError as e:
+            self._error("; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+            return
+        except ValueError as e:
+            self._error(str(e))
+            return
+        if len(self._pending_characters) + len(self._pending_scenes) >= bulk_batch_size:
+            self.flush()
+
+    def _error(self, detail: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_IMPORT_ERRORS:
+            self.errors.append({"line": self.line, "detail": detail})
+
+    def _add_character(self, character: Character) -> None:
+        if character.id in self._last_numbers or store.has_character(character.id):
+            raise ValueError(f"character {character.id} already exists")
+        self._last_numbers[character.id] = 0
+        self.sceneless[character.id] = None
+        self._pending_characters.append(character)
+
+    def _add_scene(self, scene: SceneRecord) -> None:
+        last_number = self._last_numbers.get(scene.characterId)
+        if last_number is None:
+            raise ValueError(f"scene {scene.id} belongs to {scene.characterId}, which is not part of this import")
+        if scene.sceneNumber <= last_number:
+            raise ValueError(f"scene {scene.id} has sceneNumber {scene.sceneNumber}, expected more than {last_number}")
+        if scene.id in self._scene_characters or store.has_scene(scene.id):
+            raise ValueError(f"scene {scene.id} already exists")
+        if scene.previousSceneId and self._scene_characters.get(scene.previousSceneId) != scene.characterId:
+            raise ValueError(f"previousSceneId {scene.previousSceneId} is not an earlier scene of {scene.characterId}")
+        self._last_numbers[scene.characterId] = scene.sceneNumber
+        self._scene_characters[scene.id] = scene.characterId
+        self.sceneless.pop(scene.characterId, None)
+        scene.branchId, scene.depth = None, None
+        self._pending_scenes.append(scene)
+
+    def flush(self) -> None:
+        if self._pending_characters:
+            store.add_characters(self._pending_characters)
+            self.characters += len(self._pending_characters)
+            self._pending_characters = []
+        if self._pending_scenes:
+            store.add_scenes(self._pending_scenes)
+            self.scenes += len(self._pending_scenes)
+            self._pending_scenes = []
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "characters": self.characters,
+            "scenes": self.scenes,
+            "lines": self.line,
+            "errorCount": self.error_count,
+            "errors": self.errors
+        }
+
+
+async def generate_first_scenes(character_ids: List[str]) -> Dict[str, int]:
+    """First scenes for characters that have none, CHRONICLE_BATCH_PARALLELISM at a time"""
+    semaphore = asyncio.Semaphore(batch_parallelism)
+    
+    async def generate(character_id: str) -> bool:
+        async with semaphore:
+            character = await run_store(store.get_character, character_id)
+            if character is None or await run_store(store.scene_count, character_id):
+                return False
+            await run_store(store.append_scene, await generate_first_scene(character))
+            return True
+    
+    results = await asyncio.gather(*(generate(character_id) for character_id in character_ids), return_exceptions=True)
+    failed = [r for r in results if isinstance(r, BaseException)]
+    if failed:
+        logger.error(f"❌ {len(failed)} of {len(character_ids)} first scenes failed, e.g.: {failed[0]}")
+    return {"generated": sum(1 for r in results if r is True), "failed": len(failed)}
+
+
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
+def route_template(scope) -> str:
+    """"METHOD /path/{param}" of the route a request matches"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return f"{scope['method']} {route.path}"
+    return f"{scope['method']} <unmatched>"
+
+
+@app.middleware("http")
+async def track_endpoint(request: Request, call_next):
+    """Per-route latency, in-flight gauge and phase breakdown of each request.
+
+    Phases recorded with span() are returned in a Server-Timing header and
+    logged for a CHRONICLE_TRACE_SAMPLE_RATE fraction of requests.
+    """
+    endpoint = route_template(request.scope)
+    current_endpoint.set(endpoint)
+    trace = RequestTrace()
+    current_trace.set(trace)
+    requests_in_flight.inc(endpoint=endpoint)
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        requests_in_flight.dec(endpoint=endpoint)
+        elapsed = trace.elapsed()
+        request_seconds.observe(elapsed, endpoint=endpoint, status=str(status))
+    
+    if trace.phases:
+        response.headers["Server-Timing"] = trace.server_timing()
+        if trace_sample_rate and random.random() < trace_sample_rate:
+            logger.info(f"⏱️  {endpoint} {status} in {elapsed * 1000:.1f}ms - {trace.summary()}")
+    return response
+
+
 @app.get("/")
 def read_root():
     """Health check endpoint"""
@@ -363,83 +3841,327 @@ def read_root():
     }
 
 
+def new_character(character_data: CharacterCreate) -> Character:
+    return Character(
+        id=id_generator.new_id("char"),
+        name=character_data.name,
+        canonicalAppearance=character_data.canonicalAppearance,
+        personality=character_data.personality,
+        emotionalBaseline=character_data.emotionalBaseline,
+        immutableTraits=character_data.immutableTraits,
+        createdAt=datetime.now().isoformat()
+    )
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def start_job_workers() -> None:
+    """Resume jobs left queued, or abandoned mid-run, by earlier workers"""
+    jobs.start()
+
+
+app.router.add_event_handler("startup", start_job_workers)
+
+
 @app.post("/api/characters", response_model=Dict[str, Any])
-def create_character(character_data: CharacterCreate):
-    """Create a new character and generate first scene"""
+async def create_character(
+    character_data: CharacterCreate,
+    response: Response,
+    first_scene_mode: str = Query(
+        "generate",
+        alias="firstScene",
+        pattern="^(generate|defer)$",
+        description="generate the first scene before responding, or defer it to a background job (202 + job)"
+    )
+):
+    """Create a new character and generate first scene.
+
+    With firstScene=defer the character is stored and the response (202)
+    carries a job to poll at GET /api/jobs/{jobId} or follow at
+    GET /api/jobs/{jobId}/events, so latency no longer depends on the model.
+    """
     
     try:
-        # Create character
-        character_id = f"char_{int(datetime.now().timestamp() * 1000)}"
-        character = Character(
-            id=character_id,
-            name=character_data.name,
-            canonicalAppearance=character_data.canonicalAppearance,
-            personality=character_data.personality,
-            emotionalBaseline=character_data.emotionalBaseline,
-            immutableTraits=character_data.immutableTraits,
-            createdAt=datetime.now().isoformat()
-        )
+        if first_scene_mode == "defer":
+            character = new_character(character_data)
+            with span("store"):
+                await run_store(store.add_character, character)
+                job = await jobs.submit("first_scene", character.id)
+            response.status_code = 202
+            return {
+                "character": character.dict(),
+                "job": job.info(),
+                "message": f"Character '{character.name}' created, first scene queued"
+            }
+        
+        # Turn the request away before storing anything if the model is saturated
+        admission.check("scene")
         
-        # Store character
-        characters_db[character_id] = character
+        # Create and store character
+        character = new_character(character_data)
+        with span("store"):
+            await run_store(store.add_character, character)
         
-        # Generate first scene using AI
-        first_scene = generate_first_scene(character)
-        scenes_db[first_scene.id] = first_scene
+        # Generate first scene using AI; a character is never left without one
+        try:
+            with span("first_scene"):
+                first_scene = await generate_first_scene(character)
+        except BaseException:
+            await run_store(store.delete_character, character.id)
+            raise
+        with span("store"):
+            await run_store(store.append_scene, first_scene)
         
         return {
             "character": character.dict(),
-            "firstScene": first_scene.dict(),
+            "firstScene": first_scene.to_dict(),
             "message": f"Character '{character.name}' created successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating character: {str(e)}")
 
 
+@app.post("/api/characters/stream")
+async def create_character_stream(character_data: CharacterCreate):
+    """Create a character and stream its first scene as server-sent events.
+
+    Events: `character` once stored, `field` per completed scene field,
+    then `done` with the same body as POST /api/characters (or `error`,
+    with `retryAfter` when the model was over capacity).
+    """
+    
+    admission.check("scene")
+    character = new_character(character_data)
+    await run_store(store.add_character, character)
+    
+    async def events():
+        stored = False
+        try:
+            yield sse_event("character", character.dict())
+            async for kind, payload in stream_first_scene(character):
+                if kind == "field":
+                    yield sse_event("field", payload)
+                else:
+                    await run_store(store.append_scene, payload)
+                    stored = True
+                    yield sse_event("done", {
+                        "character": character.dict(),
+                        "firstScene": payload.to_dict(),
+                        "message": f"Character '{character.name}' created successfully"
+                    })
+        except AdmissionRejected as e:
+            yield sse_event("error", {"detail": e.detail, "retryAfter": e.retry_after})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error creating character: {str(e)}"})
+        finally:
+            # As in POST /api/characters, a character is never left without a first scene,
+            # whether the model failed or the client went away mid-stream. In the latter case
+            # the request scope is already cancelled, so the cleanup is shielded from it.
+            if not stored:
+                with anyio.CancelScope(shield=True):
+                    if await run_store(store.has_character, character.id):
+                        await run_store(store.delete_character, character.id)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.get("/api/characters/{character_id}", response_model=Character)
 def get_character(character_id: str):
     """Get character by ID"""
     
-    if character_id not in characters_db:
+    character = store.get_character(character_id)
+    if character is None:
         raise HTTPException(status_code=404, detail="Character not found")
     
-    return characters_db[character_id]
+    return character
+
+
+def scene_projection(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields` query parameter into Scene field names"""
+    if fields is None:
+        return None
+    projection = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in projection if f not in Scene.model_fields]
+    if unknown or not projection:
+        raise HTTPException(status_code=400, detail=f"Unknown scene fields: {', '.join(unknown) or '(none given)'}")
+    return projection
+
+
+def scenes_json(scenes: List[SceneRecord], projection: Optional[List[str]]) -> str:
+    if projection is None:
+        return json.dumps([scene.to_dict() for scene in scenes])
+    return json.dumps([{f: scene.get(f) for f in projection} for scene in scenes])
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header names etag (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
 
 
 @app.get("/api/characters/{character_id}/scenes", response_model=List[Scene])
-def get_character_scenes(character_id: str):
-    """Get all scenes for a character"""
+def get_character_scenes(
+    character_id: str,
+    request: Request,
+    after: int = Query(0, ge=0, description="Only scenes with a sceneNumber above this cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Max scenes per page (all when omitted)"),
+    fields: Optional[str] = Query(None, description="Comma-separated Scene fields to return, e.g. id,sceneNumber")
+):
+    """Get the scenes of a character, ordered by sceneNumber.
+
+    When a page stops short of the last scene, the X-Next-Cursor header holds
+    the `after` value for the next page. Every response carries an ETag of
+    the character's history and query, and a matching If-None-Match returns
+    304 before any scene is read or serialized.
+    """
+    
+    projection = scene_projection(fields)
     
-    if character_id not in characters_db:
+    if not store.has_character(character_id):
         raise HTTPException(status_code=404, detail="Character not found")
     
-    character_scenes = [
-        scene for scene in scenes_db.values()
-        if scene.characterId == character_id
-    ]
+    etag = '"' + hashlib.sha256(
+        f"{character_id}|{store.history_version(character_id)}|{after}|{limit}|{projection}".encode()
+    ).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    page = store.scene_page(character_id, after, None if limit is None else limit + 1)
+    if limit is not None and len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = str(page[-1].sceneNumber)
+    
+    return Response(content=scenes_json(page, projection), media_type="application/json", headers=headers)
+
+
+@app.get("/api/characters/{character_id}/branches", response_model=List[Dict[str, Any]])
+def get_character_branches(character_id: str):
+    """Story branches of a character: where each forks off and its latest scene"""
+    
+    if not store.has_character(character_id):
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    return store.character_branches(character_id)
+
+
+@app.get("/api/scenes/{scene_id}/lineage", response_model=List[Scene])
+def get_scene_lineage(
+    scene_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated Scene fields to return, e.g. id,depth")
+):
+    """Path from the first scene of the story to this scene, across the branches it forked from"""
+    
+    projection = scene_projection(fields)
+    if not store.has_scene(scene_id):
+        raise HTTPException(status_code=404, detail="Scene not found")
+    
+    return Response(content=scenes_json(store.scene_chain(scene_id), projection), media_type="application/json")
+
+
+@app.get("/api/export")
+def export_characters(
+    character_id: Optional[str] = Query(None, alias="characterId", description="Export only this character")
+):
+    """Stream characters and their scenes as NDJSON, the format POST /api/import reads back.
+
+    One `{"type": "character", ...}` line per character, followed by a
+    `{"type": "scene", ...}` line per scene in sceneNumber order.
+    """
+    
+    if character_id is not None and not store.has_character(character_id):
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    character_ids = [character_id] if character_id is not None else store.character_ids()
+    return StreamingResponse(
+        export_lines(character_ids),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chronicle-export.ndjson"'}
+    )
+
+
+@app.post("/api/import", response_model=Dict[str, Any])
+async def import_characters(
+    request: Request,
+    first_scenes: str = Query(
+        "skip",
+        alias="firstScenes",
+        pattern="^(skip|defer|generate)$",
+        description="For imported characters without scenes: skip, defer (one background job each) or generate before responding"
+    )
+):
+    """Import characters and scenes from an NDJSON body as produced by GET /api/export.
+
+    The body is validated and stored as it streams in, so memory stays flat
+    however large the upload. Invalid lines are skipped and listed in the
+    summary; a line over 1 MiB aborts the import with 413 after storing
+    the records before it. No model calls are made unless firstScenes asks
+    for them.
+    """
+    
+    importer = NDJSONImporter()
+    tail = b""
+    async for chunk in request.stream():
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        await run_store(importer.feed_lines, lines)
+        if len(tail) > MAX_NDJSON_LINE_BYTES:
+            await run_store(importer.flush)
+            raise HTTPException(status_code=413, detail=f"Line {importer.line + 1} is longer than {MAX_NDJSON_LINE_BYTES} bytes")
+    await run_store(importer.feed_lines, [tail])
+    await run_store(importer.flush)
+    
+    summary = importer.summary()
+    sceneless = list(importer.sceneless)
+    if first_scenes == "generate":
+        summary["firstScenes"] = await generate_first_scenes(sceneless)
+    elif first_scenes == "defer":
+        summary["firstScenes"] = {"jobIds": [(await jobs.submit("first_scene", character_id)).id for character_id in sceneless]}
+    else:
+        summary["firstScenes"] = {"skipped": len(sceneless)}
     
-    return sorted(character_scenes, key=lambda s: s.sceneNumber)
+    logger.info(f"📦 Imported {importer.characters} characters and {importer.scenes} scenes ({importer.error_count} invalid lines)")
+    return summary
 
 
 @app.post("/api/edits", response_model=Dict[str, Any])
-def process_edit(edit_request: EditRequest):
+async def process_edit(edit_request: EditRequest):
     """Process natural language edit command"""
     
     try:
         # Validate character exists
-        if edit_request.characterId not in characters_db:
+        character = await run_store(store.get_character, edit_request.characterId)
+        if character is None:
             raise HTTPException(status_code=404, detail="Character not found")
         
         # Validate scene exists
-        if edit_request.sceneId not in scenes_db:
+        current_scene = await run_store(store.get_scene, edit_request.sceneId)
+        if current_scene is None:
             raise HTTPException(status_code=404, detail="Scene not found")
         
-        character = characters_db[edit_request.characterId]
-        current_scene = scenes_db[edit_request.sceneId]
+        admission.check("edit")
         
-        # Step 1: Parse and validate edit using AI
-        edit_analysis = parse_edit_command(character, current_scene, edit_request.command)
+        if speculative_evolve:
+            # Steps 1 and 3 overlapped: evolve while the edit is validated
+            with span("speculative_edit"):
+                edit_analysis, new_scene = await speculative_edit(character, current_scene, edit_request.command)
+        else:
+            # Step 1: Parse and validate edit using AI
+            with span("parse"):
+                edit_analysis = await parse_edit_command(character, current_scene, edit_request.command)
+            new_scene = None
         
         # Step 2: If invalid, return rejection
         if not edit_analysis.isValid:
@@ -451,66 +4173,344 @@ def process_edit(edit_request: EditRequest):
             }
         
         # Step 3: Generate evolved scene
-        new_scene = generate_evolved_scene(character, current_scene, edit_analysis)
-        scenes_db[new_scene.id] = new_scene
+        if new_scene is None:
+            with span("evolve"):
+                new_scene = await generate_evolved_scene(character, current_scene, edit_analysis)
+        with span("store"):
+            await run_store(store.append_scene, new_scene)
         
         return {
             "success": True,
             "rejected": False,
-            "newScene": new_scene.dict(),
+            "newScene": new_scene.to_dict(),
             "editType": edit_analysis.editType,
             "narrativeDelta": edit_analysis.narrativeDelta
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing edit: {str(e)}")
 
 
+@app.post("/api/edits/batch", response_model=Dict[str, Any])
+async def process_edit_batch(batch_request: BatchEditRequest):
+    """Process several edit commands against one scene.
+
+    All commands are validated together in one model call, then approved
+    edits are evolved with at most CHRONICLE_BATCH_PARALLELISM in flight.
+    With chain=true each approved edit builds on the scene produced by the
+    previous approved edit instead of the requested scene, and every command
+    after that first edit is validated again against the scene it builds on.
+    """
+    
+    character = await run_store(store.get_character, batch_request.characterId)
+    if character is None:
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    start_scene = await run_store(store.get_scene, batch_request.sceneId)
+    if start_scene is None:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    
+    admission.check("edit_batch")
+    
+    try:
+        with span("parse"):
+            analyses = await parse_edit_commands(character, start_scene, batch_request.commands)
+        
+        def result(command: str, edit_analysis: EditAnalysis, new_scene: Optional[SceneRecord] = None) -> Dict[str, Any]:
+            if new_scene is None:
+                return {
+                    "command": command,
+                    "success": False,
+                    "rejected": True,
+                    "reason": edit_analysis.rejectionReason,
+                    "editType": edit_analysis.editType
+                }
+            return {
+                "command": command,
+                "success": True,
+                "rejected": False,
+                "newScene": new_scene.to_dict(),
+                "editType": edit_analysis.editType,
+                "narrativeDelta": edit_analysis.narrativeDelta
+            }
+        
+        if batch_request.chain:
+            results = []
+            current_scene = start_scene
+            for command, edit_analysis in zip(batch_request.commands, analyses):
+                if current_scene is not start_scene:
+                    # The batch verdict judged the command against the requested scene
+                    with span("parse"):
+                        edit_analysis = await parse_edit_command(character, current_scene, command)
+                if not edit_analysis.isValid:
+                    results.append(result(command, edit_analysis))
+                    continue
+                with span("evolve"):
+                    current_scene = await generate_evolved_scene(character, current_scene, edit_analysis)
+                await run_store(store.append_scene, current_scene)
+                results.append(result(command, edit_analysis, current_scene))
+        else:
+            semaphore = asyncio.Semaphore(batch_parallelism)
+            
+            async def evolve(command: str, edit_analysis: EditAnalysis) -> Dict[str, Any]:
+                if not edit_analysis.isValid:
+                    return result(command, edit_analysis)
+                async with semaphore:
+                    with span("evolve"):
+                        new_scene = await generate_evolved_scene(character, start_scene, edit_analysis)
+                await run_store(store.append_scene, new_scene)
+                return result(command, edit_analysis, new_scene)
+            
+            results = await asyncio.gather(*(
+                evolve(command, edit_analysis)
+                for command, edit_analysis in zip(batch_request.commands, analyses)
+            ))
+        
+        return {
+            "results": results,
+            "approved": sum(1 for r in results if r["success"]),
+            "rejected": sum(1 for r in results if r["rejected"])
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch edit: {str(e)}")
+
+
+@app.post("/api/edits/stream")
+async def process_edit_stream(edit_request: EditRequest):
+    """Process an edit command, streaming progress as server-sent events.
+
+    Events: `verdict` as soon as the edit is parsed, `field` per completed
+    field of the evolved scene, then `done` with the same body as
+    POST /api/edits (or `error`, with `retryAfter` when the model was over
+    capacity).
+    """
+    
+    character = await run_store(store.get_character, edit_request.characterId)
+    if character is None:
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    current_scene = await run_store(store.get_scene, edit_request.sceneId)
+    if current_scene is None:
+        raise HTTPException(status_code=404, detail="Scene not found")
+    
+    admission.check("edit")
+    
+    async def events():
+        try:
+            edit_analysis = await parse_edit_command(character, current_scene, edit_request.command)
+            yield sse_event("verdict", {
+                "isValid": edit_analysis.isValid,
+                "editType": edit_analysis.editType,
+                "rejectionReason": edit_analysis.rejectionReason,
+                "narrativeDelta": edit_analysis.narrativeDelta
+            })
+            
+            if not edit_analysis.isValid:
+                yield sse_event("done", {
+                    "success": False,
+                    "rejected": True,
+                    "reason": edit_analysis.rejectionReason,
+                    "editType": edit_analysis.editType
+                })
+                return
+            
+            async for kind, payload in stream_evolved_scene(character, current_scene, edit_analysis):
+                if kind == "field":
+                    yield sse_event("field", payload)
+                else:
+                    await run_store(store.append_scene, payload)
+                    yield sse_event("done", {
+                        "success": True,
+                        "rejected": False,
+                        "newScene": payload.to_dict(),
+                        "editType": edit_analysis.editType,
+                        "narrativeDelta": edit_analysis.narrativeDelta
+                    })
+        except AdmissionRejected as e:
+            yield sse_event("error", {"detail": e.detail, "retryAfter": e.retry_after})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error processing edit: {str(e)}"})
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @app.get("/api/characters/{character_id}/recap", response_model=Dict[str, str])
-def get_memory_recap(character_id: str):
+async def get_memory_recap(character_id: str):
     """Generate AI memory recap for character's journey"""
     
     try:
-        if character_id not in characters_db:
+        character = await run_store(store.get_character, character_id)
+        if character is None:
             raise HTTPException(status_code=404, detail="Character not found")
         
-        character = characters_db[character_id]
-        character_scenes = [
-            scene for scene in scenes_db.values()
-            if scene.characterId == character_id
-        ]
-        
-        if not character_scenes:
-            return {"recap": "No scenes yet to generate a recap."}
-        
-        recap = generate_memory_recap(character, character_scenes)
+        with span("recap"):
+            recap = await generate_memory_recap(character)
         
         return {"recap": recap}
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recap: {str(e)}")
 
 
+@app.post("/api/characters/{character_id}/recap", response_model=Dict[str, Any], status_code=202)
+async def queue_memory_recap(character_id: str):
+    """Generate the memory recap in a background job; poll or follow the returned job for it"""
+    
+    if not await run_store(store.has_character, character_id):
+        raise HTTPException(status_code=404, detail="Character not found")
+    
+    return (await jobs.submit("recap", character_id)).info()
+
+
+@app.get("/api/jobs/{job_id}", response_model=Dict[str, Any])
+def get_job(job_id: str):
+    """Status of a background job; `result` holds its output once it succeeded"""
+    
+    job = store.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return job.info()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def follow_job(job_id: str):
+    """Follow a background job as server-sent events.
+
+    Events: `status` with the job on every state change, then `done` with
+    the finished job (succeeded or failed).
+    """
+    
+    if await run_store(store.get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        async for job in jobs.watch(job_id):
+            yield sse_event("done" if job.finished else "status", job.info())
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/api/stats")
+def get_stats():
+    """Cache and orchestration counters"""
+    return {
+        "admission": admission.stats(),
+        "jobs": jobs.stats(),
+        "storeCache": store.cache_stats(),
+        "editCache": edit_cache.stats(),
+        "editPrefilter": edit_prefilter.stats(),
+        "jsonParsing": json_parse_stats.stats(),
+        "prompts": prompt_builder.stats(),
+        "retrieval": scene_retriever.stats(),
+        "singleFlight": model_calls.stats(),
+        "speculation": speculation_stats.stats(),
+        "tokens": token_usage.stats()
+    }
+
+
+@metrics.collector
+def component_metrics() -> List[Metric]:
+    """Counters kept by the admission queue, job queue, store cache, edit cache, pre-filter, JSON parsing, prompt builder, scene retrieval and token accounting"""
+    cache = edit_cache.stats()
+    prefilter = edit_prefilter.stats()
+    prompts = prompt_builder.stats()
+    usage = token_usage.stats()
+    store_cache = store.cache_stats()
+    retrieval = scene_retriever.stats()
+    return [
+        Gauge.of("chronicle_llm_admission_active", "Model calls holding an admission slot", (), {(): admission.active}),
+        Gauge.of("chronicle_llm_admission_queued", "Model calls waiting in the admission queue", (), {(): admission.queued}),
+        Counter.of("chronicle_llm_admission_rejected_total", "Requests and model calls refused with 429 because the queue was full", ("task",), {
+            (task,): count for task, count in admission.rejected.items()
+        }),
+        Counter.of("chronicle_store_cache_lookups_total", "Characters and scenes read through the per-process store cache", ("result",), {
+            ("hit",): store_cache["hits"], ("miss",): store_cache["misses"]
+        }),
+        Counter.of("chronicle_store_cache_invalidations_total", "Store cache keys invalidated by writes in other processes", (), {
+            (): store_cache["invalidations"]
+        }),
+        Gauge.of("chronicle_jobs_queued", "Background jobs waiting for a worker in this process", (), {(): jobs.stats()["queued"]}),
+        Counter.of("chronicle_jobs_total", "Background job attempts by outcome", ("kind", "outcome"), {
+            (kind, outcome): count
+            for kind, counts in jobs.outcomes.items()
+            for outcome, count in counts.items()
+        }),
+        Counter.of("chronicle_edit_cache_lookups_total", "Edit-parse cache lookups", ("result",), {
+            ("hit",): cache["hits"], ("miss",): cache["misses"]
+        }),
+        Counter.of("chronicle_edit_cache_evictions_total", "Edit-parse cache evictions", (), {(): cache["evictions"]}),
+        Gauge.of("chronicle_edit_cache_entries", "Edit-parse results cached", (), {(): cache["entries"]}),
+        Gauge.of("chronicle_edit_cache_bytes", "Approximate size of cached edit-parse results", (), {(): cache["bytes"]}),
+        Counter.of("chronicle_edit_prefilter_total", "Edit commands seen by the local pre-filter", ("outcome",), {
+            ("rejected",): prefilter["rejected"],
+            ("approved",): prefilter["approved"],
+            ("passed",): prefilter["passedToModel"]
+        }),
+        Counter.of("chronicle_json_parse_total", "Model answers parsed, failed, repaired or unrecoverable", ("task", "outcome"), {
+            (task, outcome): count
+            for task, counts in json_parse_stats.counts.items()
+            for outcome, count in counts.items()
+        }),
+        Counter.of("chronicle_prompt_canon_cache_total", "Canon block cache lookups", ("result",), {
+            ("hit",): prompts["canonCacheHits"], ("miss",): prompts["canonCacheMisses"]
+        }),
+        Counter.of("chronicle_prompt_truncations_total", "Free-text passages clipped to fit a prompt", (), {
+            (): prompts["truncatedTexts"]
+        }),
+        Counter.of("chronicle_retrieval_queries_total", "Related-scene lookups for prompts", (), {(): retrieval["queries"]}),
+        Counter.of("chronicle_retrieval_indexed_scenes_total", "Scenes added to the per-character retrieval indexes", (), {
+            (): retrieval["indexedScenes"]
+        }),
+        Counter.of("chronicle_retrieval_rebuilds_total", "Retrieval indexes rebuilt from the store", (), {(): retrieval["rebuilds"]}),
+        Counter.of("chronicle_speculative_evolves_total", "Speculative evolves by outcome", ("outcome",), {
+            (outcome,): count for outcome, count in speculation_stats.outcomes.items()
+        }),
+        Counter.of("chronicle_speculative_wasted_tokens_total", "Estimated tokens spent on discarded or cancelled speculative evolves", (), {
+            (): speculation_stats.wasted_tokens
+        }),
+        Counter.of("chronicle_llm_coalesced_total", "Model calls answered by joining an identical in-flight call", ("task",), {
+            (task,): count for task, count in model_calls.coalesced.items()
+        }),
+        Counter.of("chronicle_llm_calls_total", "Model calls per endpoint and task", ("endpoint", "task"), {
+            (endpoint, task): counts["calls"]
+            for endpoint, by_task in usage.items()
+            for task, counts in by_task.items()
+        }),
+        Counter.of("chronicle_llm_tokens_total", "Model input and output tokens", ("endpoint", "task", "direction"), {
+            (endpoint, task, direction): counts[field]
+            for endpoint, by_task in usage.items()
+            for task, counts in by_task.items()
+            for direction, field in (("input", "inputTokens"), ("output", "outputTokens"))
+        })
+    ]
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of request, model-call and cache metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.delete("/api/characters/{character_id}")
 def delete_character(character_id: str):
     """Delete character and all associated scenes"""
     
-    if character_id not in characters_db:
+    if not store.has_character(character_id):
         raise HTTPException(status_code=404, detail="Character not found")
     
-    # Delete character
-    del characters_db[character_id]
-    
-    # Delete all scenes for this character
-    scene_ids_to_delete = [
-        scene_id for scene_id, scene in scenes_db.items()
-        if scene.characterId == character_id
-    ]
-    for scene_id in scene_ids_to_delete:
-        del scenes_db[scene_id]
+    # Delete character and all scenes for this character
+    deleted_scenes = store.delete_character(character_id)
     
     return {
-        "message": f"Character and {len(scene_ids_to_delete)} scenes deleted successfully"
+        "message": f"Character and {deleted_scenes} scenes deleted successfully"
     }
 
 
@@ -533,7 +4533,7 @@ def load_demo_data():
         createdAt=datetime.now().isoformat()
     )
     
-    characters_db[demo_character.id] = demo_character
+    store.add_character(demo_character)
     
     # Create demo scenes
     demo_scenes = [
@@ -602,12 +4602,11 @@ def load_demo_data():
         )
     ]
     
-    for scene in demo_scenes:
-        scenes_db[scene.id] = scene
+    store.add_scenes(demo_scenes)
     
     return {
         "character": demo_character.dict(),
-        "scenes": [s.dict() for s in demo_scenes],
+        "scenes": [store.get_scene(s.id).to_dict() for s in demo_scenes],
         "message": "Demo data loaded successfully"
     }
 
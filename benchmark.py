@@ -0,0 +1,1119 @@
+"""
+Chronicle Benchmarks
+Offline micro/endpoint benchmarks for the Chronicle backend
+
+Usage:
+    python benchmark.py storage [--sizes 1000 10000 100000 1000000]
+    python benchmark.py load [--latency 0.5] [--clients 200] [--duration 10]
+    python benchmark.py endpoints [--latency lognormal:-1.5,0.5] [--error-rate 0.01] [--seed 0]
+    python benchmark.py startup [--runs 10]
+    python benchmark.py stream [--latency 0.8] [--requests 50]
+    python benchmark.py engines [--scenes 20000]
+    python benchmark.py stress [--edits 5000] [--db PATH]
+    python benchmark.py prefilter [--latency 0.3] [--rounds 5]
+    python benchmark.py speculative [--latency 0.3] [--edits 20] [--reject-rate 0.2]
+    python benchmark.py coalesce [--requests 200] [--latency 0.2]
+    python benchmark.py history [--scenes 10000] [--requests 50] [--db PATH]
+    python benchmark.py lineage [--depth 10000] [--fork-every 1000] [--db PATH]
+    python benchmark.py memory [--scenes 1000000] [--serialize 100000]
+    python benchmark.py overload [--arrival-rate 60] [--rate 40] [--duration 10]
+    python benchmark.py bulk [--scenes 100000] [--scenes-per-character 1000] [--db PATH]
+    python benchmark.py jobs [--latency 1.0] [--characters 50] [--concurrency 10]
+    python benchmark.py workers [--workers 1 2 4] [--clients 4] [--duration 10]
+    python benchmark.py retrieval [--scenes 100000] [--queries 1000] [--db PATH]
+
+All benchmarks run in-process against backend.StubProvider, so they need
+neither network access nor a GOOGLE_API_KEY.
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import multiprocessing
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import httpx
+from fastapi.testclient import TestClient
+
+import backend
+
+logging.getLogger().setLevel(logging.WARNING)
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(
+        f"  {label:<28} p50={percentile(samples, 50) * 1000:8.3f}ms "
+        f"p99={percentile(samples, 99) * 1000:8.3f}ms "
+        f"mean={statistics.mean(samples) * 1000:8.3f}ms"
+    )
+
+
+def bench_character(c, now):
+    return backend.Character(
+        id=f"char_bench_{c}",
+        name=f"Bench {c}",
+        canonicalAppearance="plain",
+        personality="patient",
+        emotionalBaseline="calm",
+        immutableTraits=["plain"],
+        createdAt=now
+    )
+
+
+def bench_scenes(c, count, now):
+    """A chain of `count` scenes for bench character c"""
+    scenes, previous = [], None
+    for n in range(1, count + 1):
+        scene_id = f"scene_bench_{c}_{n}"
+        scenes.append(backend.Scene(
+            id=scene_id,
+            characterId=f"char_bench_{c}",
+            sceneNumber=n,
+            sceneDescription="Benchmark scene description.",
+            visualPrompt="Benchmark visual prompt.",
+            emotionalState="calm",
+            environment="benchmark lab",
+            narrativeSummary="Nothing happens, quickly.",
+            timestamp=now,
+            edits=[],
+            previousSceneId=previous
+        ))
+        previous = scene_id
+    return scenes
+
+
+def populate(total_scenes, scenes_per_character=10):
+    """Fill a fresh store with total_scenes scenes spread over many characters"""
+    backend.store = backend.StoryStore()
+    now = datetime.now().isoformat()
+    for c in range(max(1, total_scenes // scenes_per_character)):
+        backend.store.add_character(bench_character(c, now))
+        for scene in bench_scenes(c, scenes_per_character, now):
+            backend.store.add_scene(scene)
+
+
+def bench_storage(args):
+    """Latency of /api/edits and scene listing as the total scene count grows"""
+    backend.model_provider = backend.StubProvider()
+    client = TestClient(backend.app)
+
+    for size in args.sizes:
+        populate(size)
+        character_id = "char_bench_0"
+        print(f"total scenes: {size}")
+
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            response = client.get(f"/api/characters/{character_id}/scenes")
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200
+        report("GET /characters/{id}/scenes", samples)
+
+        samples = []
+        scene_id = "scene_bench_0_1"
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            response = client.post("/api/edits", json={
+                "characterId": character_id,
+                "sceneId": scene_id,
+                "command": "She relaxes"
+            })
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200
+        report("POST /api/edits", samples)
+
+
+async def _load(args):
+    transport = httpx.ASGITransport(app=backend.app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        await client.post("/api/demo/load")
+        deadline = time.perf_counter() + args.duration
+        edit_latencies, health_latencies = [], []
+
+        async def edit_client():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/api/edits", json={
+                    "characterId": "char_demo",
+                    "sceneId": "scene_demo_4",
+                    "command": "She catches her breath"
+                })
+                assert response.status_code == 200, response.text
+                edit_latencies.append(time.perf_counter() - start)
+
+        async def health_probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        await asyncio.gather(health_probe(), *(edit_client() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    print(f"clients={args.clients} stub latency={args.latency}s duration={elapsed:.1f}s")
+    print(f"  POST /api/edits throughput      {len(edit_latencies) / elapsed:8.1f} req/s")
+    report("POST /api/edits", edit_latencies)
+    report("GET / (under load)", health_latencies)
+
+
+def bench_load(args):
+    """Requests per second one worker sustains against a slow stub model"""
+    backend.model_provider = backend.StubProvider(latency=f"fixed:{args.latency}")
+    asyncio.run(_load(args))
+
+
+CHARACTER_PAYLOAD = {
+    "name": "Bench Runner",
+    "canonicalAppearance": "Tall, grey eyes, green scarf",
+    "personality": "Methodical and patient",
+    "emotionalBaseline": "Calm focus",
+    "immutableTraits": ["grey eyes", "green scarf"]
+}
+
+
+async def _endpoints(args):
+    transport = httpx.ASGITransport(app=backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/demo/load")
+        created = []
+
+        async def create_character():
+            response = await client.post("/api/characters", json=CHARACTER_PAYLOAD)
+            if response.status_code == 200:
+                created.append(response.json()["character"]["id"])
+            return response
+
+        async def delete_character():
+            if not created:
+                return await client.delete("/api/characters/char_missing")
+            return await client.delete(f"/api/characters/{created.pop()}")
+
+        endpoints = [
+            ("GET /", lambda: client.get("/")),
+            ("POST /api/characters", create_character),
+            ("GET /api/characters/{id}", lambda: client.get("/api/characters/char_demo")),
+            ("GET /characters/{id}/scenes", lambda: client.get("/api/characters/char_demo/scenes")),
+            ("POST /api/edits", lambda: client.post("/api/edits", json={
+                "characterId": "char_demo",
+                "sceneId": "scene_demo_4",
+                "command": "She steadies her breathing"
+            })),
+            ("GET /characters/{id}/recap", lambda: client.get("/api/characters/char_demo/recap")),
+            ("DELETE /api/characters/{id}", delete_character),
+        ]
+
+        print(f"stub latency={args.latency} error rate={args.error_rate} seed={args.seed} "
+              f"requests={args.requests} concurrency={args.concurrency}")
+        for label, call in endpoints:
+            latencies, errors = [], 0
+            pending = iter(range(args.requests))
+
+            async def worker():
+                nonlocal errors
+                for _ in pending:
+                    start = time.perf_counter()
+                    response = await call()
+                    latencies.append(time.perf_counter() - start)
+                    if response.status_code >= 400:
+                        errors += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            report(label, latencies)
+            print(f"  {'':<28} {len(latencies) / elapsed:8.1f} req/s, {errors} errors")
+
+
+def bench_endpoints(args):
+    """Throughput and latency of every endpoint against the stub provider"""
+    backend.model_provider = backend.StubProvider(
+        latency=args.latency, error_rate=args.error_rate, seed=args.seed
+    )
+    asyncio.run(_endpoints(args))
+
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import backend
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+TestClient(backend.app).get("/")
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def bench_startup(args):
+    """Cold worker startup: import time and time to first served request"""
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    import_times, first_request_times, process_times = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT],
+            capture_output=True, text=True, env=env, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        process_times.append(time.perf_counter() - start)
+        import_time, first_request = (float(v) for v in result.stdout.split()[-2:])
+        import_times.append(import_time)
+        first_request_times.append(first_request)
+
+    print(f"runs={args.runs}")
+    report("import backend", import_times)
+    report("import + first request", first_request_times)
+    report("whole process", process_times)
+
+
+def serve_in_thread(port):
+    """Run the app under a real uvicorn server in a daemon thread"""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(backend.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+async def _stream(args):
+    base_url = f"http://127.0.0.1:{args.port}"
+    body = {"characterId": "char_demo", "sceneId": "scene_demo_4", "command": "She exhales slowly"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await client.post("/api/demo/load")
+        for path in ("/api/edits", "/api/edits/stream"):
+            ttfb, totals = [], []
+            for i in range(args.requests):
+                start = time.perf_counter()
+                async with client.stream("POST", path, json={**body, "command": f"{body['command']} {path} {i}"}) as response:
+                    first = None
+                    async for chunk in response.aiter_raw():
+                        if chunk and first is None:
+                            first = time.perf_counter() - start
+                totals.append(time.perf_counter() - start)
+                ttfb.append(first)
+            print(path)
+            report("time to first byte", ttfb)
+            report("total", totals)
+
+
+def bench_stream(args):
+    """Time to first byte and total latency of /api/edits vs /api/edits/stream"""
+    backend.model_provider = backend.StubProvider(latency=f"fixed:{args.latency}")
+    server = serve_in_thread(args.port)
+    try:
+        asyncio.run(_stream(args))
+    finally:
+        server.should_exit = True
+
+
+def bench_engines(args):
+    """Insert and list throughput: in-memory StoryStore vs SQLiteStoryStore"""
+    now = datetime.now().isoformat()
+    per_character = 20
+    characters = max(1, args.scenes // per_character)
+    scenes = [bench_scenes(c, per_character, now) for c in range(characters)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = [
+            ("memory", lambda: backend.StoryStore()),
+            ("sqlite", lambda: backend.SQLiteStoryStore(os.path.join(tmp, "single.db"))),
+            ("sqlite bulk", lambda: backend.SQLiteStoryStore(os.path.join(tmp, "bulk.db"))),
+        ]
+        print(f"scenes={characters * per_character} ({per_character} per character)")
+        for label, make in engines:
+            engine = make()
+            start = time.perf_counter()
+            for c in range(characters):
+                engine.add_character(bench_character(c, now))
+                if label == "sqlite bulk":
+                    engine.add_scenes(scenes[c])
+                else:
+                    for scene in scenes[c]:
+                        engine.add_scene(scene)
+            insert_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for c in range(characters):
+                assert len(engine.character_scenes(f"char_bench_{c}")) == per_character
+            list_elapsed = time.perf_counter() - start
+            print(
+                f"  {label:<12} insert {characters * per_character / insert_elapsed:10.0f} scenes/s"
+                f"   list {characters / list_elapsed:8.0f} characters/s"
+            )
+
+
+def _generate_ids(count):
+    return [backend.id_generator.new_id("scene") for _ in range(count)]
+
+
+async def _stress(args):
+    transport = httpx.ASGITransport(app=backend.app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        await client.post("/api/demo/load")
+        before = backend.store.scene_count("char_demo")
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post("/api/edits", json={
+                "characterId": "char_demo",
+                "sceneId": f"scene_demo_{1 + i % 4}",
+                "command": f"Stress edit {i}"
+            })
+            for i in range(args.edits)
+        ))
+        elapsed = time.perf_counter() - started
+
+    failed = sum(1 for r in responses if r.status_code != 200)
+    returned_ids = {r.json()["newScene"]["id"] for r in responses if r.status_code == 200}
+    scenes = backend.store.character_scenes("char_demo")
+    numbers = [s.sceneNumber for s in scenes]
+    lost = args.edits - failed - (len(scenes) - before)
+    print(f"{args.edits} parallel edits in {elapsed:.2f}s ({args.edits / elapsed:.0f} edits/s), {failed} failed")
+    print(f"  distinct scene ids returned    {len(returned_ids)}")
+    print(f"  scenes stored                  {len(scenes) - before}")
+    print(f"  lost writes                    {lost}")
+    print(f"  duplicate sceneNumbers         {len(numbers) - len(set(numbers))}")
+    print(f"  sceneNumbers contiguous 1..n   {numbers == list(range(1, len(numbers) + 1))}")
+    return lost
+
+
+def bench_stress(args):
+    """Thousands of parallel edits plus multi-process id generation; reports lost writes"""
+    backend.model_provider = backend.StubProvider(latency="uniform:0,0.01", seed=args.seed)
+    if args.db:
+        backend.store = backend.SQLiteStoryStore(args.db)
+    lost = asyncio.run(_stress(args))
+
+    with multiprocessing.get_context("fork").Pool(args.processes) as pool:
+        batches = pool.map(_generate_ids, [args.ids] * args.processes)
+    generated = [scene_id for batch in batches for scene_id in batch]
+    ordered = all(batch == sorted(batch) for batch in batches)
+    print(f"{len(generated)} ids from {args.processes} forked processes: "
+          f"{len(generated) - len(set(generated))} collisions, per-process sorted: {ordered}")
+    if lost:
+        sys.exit(1)
+
+
+# (command, extra immutable traits, whether the edit is valid); the valid
+# commands mention colours and trait nouns without recolouring the character,
+# or change a feature only for a moment or one that is not immutable
+PREFILTER_WORKLOAD = [
+    ("Make her smile", [], True),
+    ("The room is now dimly lit", [], True),
+    ("She's tired and worried", [], True),
+    ("Change her eye color", [], False),
+    ("Make her act recklessly", [], True),
+    ("Give her blue eyes", [], False),
+    ("Remove her scar", [], False),
+    ("She looks out of the rain-streaked window", [], True),
+    ("She's suddenly excited", [], True),
+    ("Move the scene to a rooftop at dawn", [], True),
+    ("Move her to a dark alley, hair soaked by rain", [], True),
+    ("She stares at the blue sky, her eyes tired", [], True),
+    ("She stands under a gold light, hair blowing", [], True),
+    ("She meets a man with green eyes", [], True),
+    ("Her eyes turn green", [], False),
+    ("her eyes turn red from crying", [], True),
+    ("Her eyes turn dark with anger", [], True),
+    ("her hair turns silver with age", [], True),
+    ("She takes off her leather jacket", [], False),
+    ("she loses her leather jacket", [], False),
+    ("Make her smile", ["never smiles"], False),
+]
+
+
+def bench_prefilter(args):
+    """Model calls, wrong local verdicts and p50 edit latency per pre-filter mode"""
+    client = TestClient(backend.app)
+    backend.edit_cache = backend.EditCache(max_entries=0)
+    for mode in ("off", "reject", "on"):
+        backend.model_provider = backend.StubProvider(latency=f"fixed:{args.latency}")
+        backend.edit_prefilter = backend.EditPrefilter(mode=mode)
+        client.post("/api/demo/load")
+        demo = backend.store.get_character("char_demo")
+        wrong = []
+        for command, traits, valid in PREFILTER_WORKLOAD:
+            character = demo.model_copy(update={"immutableTraits": demo.immutableTraits + traits})
+            verdict = backend.edit_prefilter.check(character, command)
+            if verdict is not None and verdict.isValid != valid:
+                wrong.append(command if not traits else f"{command} ({', '.join(traits)})")
+        backend.edit_prefilter = backend.EditPrefilter(mode=mode)
+        latencies = []
+        for _ in range(args.rounds):
+            for command, traits, _valid in PREFILTER_WORKLOAD:
+                if traits:
+                    continue
+                start = time.perf_counter()
+                response = client.post("/api/edits", json={
+                    "characterId": "char_demo", "sceneId": "scene_demo_4", "command": command
+                })
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+        stats = backend.edit_prefilter.stats()
+        print(f"prefilter {mode}: {backend.model_provider.calls} model calls for {len(latencies)} edits "
+              f"({stats['rejected']} rejected, {stats['approved']} approved locally), "
+              f"{len(wrong)} wrong local verdicts{': ' + '; '.join(wrong) if wrong else ''}")
+        report("POST /api/edits", latencies)
+
+
+def bench_speculative(args):
+    """p50 edit latency and wasted tokens with speculative evolve off vs on"""
+    client = TestClient(backend.app)
+    backend.edit_cache = backend.EditCache(max_entries=0)
+    backend.edit_prefilter = backend.EditPrefilter(mode="off")
+    rejection = json.dumps({
+        "isValid": False,
+        "editType": "invalid",
+        "rejectionReason": "Changes an immutable trait",
+        "constraints": [],
+        "changes": {},
+        "narrativeDelta": ""
+    })
+    for mode in (False, True):
+        backend.speculative_evolve = mode
+        backend.speculation_stats = backend.SpeculationStats()
+        approve = backend.StubProvider(latency=f"fixed:{args.latency}")
+        reject = backend.StubProvider(latency=f"fixed:{args.latency}", responses={"edit": rejection})
+        client.post("/api/demo/load")
+        latencies = []
+        for n in range(args.edits):
+            rejected = n < args.edits * args.reject_rate
+            backend.model_provider = reject if rejected else approve
+            start = time.perf_counter()
+            response = client.post("/api/edits", json={
+                "characterId": "char_demo", "sceneId": "scene_demo_4", "command": f"She turns toward the door ({n})"
+            })
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+            assert response.json()["rejected"] == rejected, response.text
+        stats = backend.speculation_stats.stats()
+        print(f"speculative {'on' if mode else 'off'}: {approve.calls + reject.calls} model calls for {len(latencies)} edits, "
+              f"{stats['secondsSaved']}s saved, {stats['wastedTokens']} tokens wasted "
+              f"({stats['used']} used, {stats['discarded']} discarded, {stats['cancelled']} cancelled)")
+        report("POST /api/edits", latencies)
+
+
+async def _coalesce(args):
+    transport = httpx.ASGITransport(app=backend.app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        await client.post("/api/demo/load")
+        recaps = await asyncio.gather(*(
+            client.get("/api/characters/char_demo/recap") for _ in range(args.requests)
+        ))
+        recap_calls = backend.model_provider.calls
+        edits = await asyncio.gather(*(
+            client.post("/api/edits", json={
+                "characterId": "char_demo", "sceneId": "scene_demo_4", "command": "She steps out into the rain"
+            })
+            for _ in range(args.requests)
+        ))
+    return recaps, recap_calls, edits, backend.model_provider.calls - recap_calls
+
+
+def bench_coalesce(args):
+    """N concurrent identical recap and edit requests; exits 1 unless they share one model call per step"""
+    backend.model_provider = backend.StubProvider(latency=f"fixed:{args.latency}")
+    backend.edit_prefilter = backend.EditPrefilter(mode="off")
+    backend.model_calls = backend.SingleFlight()
+    recaps, recap_calls, edits, edit_calls = asyncio.run(_coalesce(args))
+
+    failed = sum(1 for r in recaps + edits if r.status_code != 200)
+    distinct_recaps = len({r.json()["recap"] for r in recaps if r.status_code == 200})
+    print(f"{args.requests} concurrent identical requests each, {failed} failed "
+          f"(single-flight {'on' if backend.single_flight_enabled else 'off'})")
+    print(f"  recap    model calls {recap_calls}, distinct answers {distinct_recaps}")
+    print(f"  edit     model calls {edit_calls} (parse + evolve)")
+    print(f"  joined in-flight calls {backend.model_calls.coalesced}")
+    if failed or (recap_calls, edit_calls) != (1, 2):
+        sys.exit(1)
+
+
+def bench_history(args):
+    """Scene listing of a long history: full list vs projected page vs 304 Not Modified"""
+    backend.store = backend.SQLiteStoryStore(args.db) if args.db else backend.StoryStore()
+    now = datetime.now().isoformat()
+    backend.store.add_character(bench_character(0, now))
+    backend.store.add_scenes(bench_scenes(0, args.scenes, now))
+    client = TestClient(backend.app)
+    url = "/api/characters/char_bench_0/scenes"
+    etag = client.get(url).headers["etag"]
+    print(f"{args.scenes} scenes, {'SQLite' if args.db else 'in-memory'} store")
+    for label, params, headers in (
+        ("full history", {}, {}),
+        ("page of 50, 3 fields", {"limit": 50, "after": args.scenes // 2, "fields": "id,sceneNumber,emotionalState"}, {}),
+        ("full history, 304", {}, {"If-None-Match": etag}),
+    ):
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.get(url, params=params, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code in (200, 304), response.text
+        print(f"  {label:<22} {response.status_code} {len(response.content):>9} bytes")
+        report(f"  GET scenes", latencies)
+
+
+def bench_lineage(args):
+    """Root-to-scene lineage at large depth, crossing a fork every N scenes, vs a previousSceneId walk"""
+    backend.store = backend.SQLiteStoryStore(args.db) if args.db else backend.StoryStore()
+    now = datetime.now().isoformat()
+    backend.store.add_character(bench_character(0, now))
+    chain = bench_scenes(0, args.depth, now)
+    scenes = []
+    for n, scene in enumerate(chain, start=1):
+        if n > 1 and n % args.fork_every == 1:
+            # A sibling stored first makes the real continuation fork a new branch
+            scenes.append(scene.model_copy(update={"id": f"{scene.id}_sibling", "sceneNumber": args.depth + n}))
+        scenes.append(scene)
+    backend.store.add_scenes(scenes)
+    tip = chain[-1].id
+
+    branches = backend.store.character_branches("char_bench_0")
+    print(f"depth {args.depth}, {len(branches)} branches, {backend.store.scene_count('char_bench_0')} scenes stored "
+          f"for {len(scenes)} created, {'SQLite' if args.db else 'in-memory'} store")
+
+    def walk():
+        if args.db:
+            rows = backend.store.db.execute(
+                "WITH RECURSIVE chain (id, previous_scene_id, data, depth) AS ("
+                " SELECT id, previous_scene_id, data, 0 FROM scenes WHERE id = ?"
+                " UNION ALL SELECT s.id, s.previous_scene_id, s.data, chain.depth + 1"
+                " FROM scenes s JOIN chain ON s.id = chain.previous_scene_id"
+                ") SELECT data FROM chain ORDER BY depth DESC",
+                (tip,)
+            )
+            return [backend.Scene.model_validate_json(row[0]) for row in rows]
+        path, scene = [], backend.store.get_scene(tip)
+        while scene is not None:
+            path.append(scene)
+            scene = backend.store.get_scene(scene.previousSceneId) if scene.previousSceneId else None
+        path.reverse()
+        return path
+
+    for label, lineage in (("previousSceneId walk", walk), ("branch index", lambda: backend.store.scene_chain(tip))):
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            path = lineage()
+            latencies.append(time.perf_counter() - start)
+        assert [s.id for s in path] == [s.id for s in chain], label
+        report(label, latencies)
+
+
+MEMORY_EMOTIONS = ["calm", "focused", "tired", "worried", "elated", "angry", "resolute", "contemplative"]
+MEMORY_ENVIRONMENTS = ["office at dusk", "rainy street", "rooftop at dawn", "dark alley", "train platform"]
+MEMORY_EDIT_TYPES = ["emotion_change", "environment_change", "visual_adjustment", "action"]
+
+
+def memory_scene_json(n, now):
+    """A scene as the model or SQLite hands it over: fresh JSON with realistic field sizes"""
+    return json.dumps({
+        "id": f"scene_mem_{n:08d}",
+        "characterId": f"char_mem_{n % 1000}",
+        "sceneNumber": n,
+        "sceneDescription": f"Scene {n}: the character crosses the room, pauses by the window and weighs what comes next.",
+        "visualPrompt": f"Character, canonical appearance, mid-stride near a window, soft key light, frame {n}",
+        "emotionalState": MEMORY_EMOTIONS[n % len(MEMORY_EMOTIONS)],
+        "environment": MEMORY_ENVIRONMENTS[n % len(MEMORY_ENVIRONMENTS)],
+        "narrativeSummary": f"Step {n} of the journey.",
+        "timestamp": now,
+        "edits": [{"command": f"Edit number {n}", "editType": MEMORY_EDIT_TYPES[n % len(MEMORY_EDIT_TYPES)], "timestamp": now}],
+        "previousSceneId": f"scene_mem_{n - 1:08d}" if n else None,
+        "branchId": f"branch_mem_{n % 1000}",
+        "depth": n // 1000 + 1
+    })
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _resident_per_scene(args):
+    kind, count = args
+    now = datetime.now().isoformat()
+    gc.collect()
+    before = _rss_bytes()
+    if kind == "store":
+        store = backend.StoryStore()
+        for n in range(count):
+            store.add_scene(backend.SceneRecord.from_json(memory_scene_json(n, now)))
+        held = store
+    else:
+        parse = backend.Scene.model_validate_json if kind == "pydantic" else backend.SceneRecord.from_json
+        held = [parse(memory_scene_json(n, now)) for n in range(count)]
+    gc.collect()
+    return (_rss_bytes() - before) / count, len(held.scenes if kind == "store" else held)
+
+
+def bench_memory(args):
+    """Resident bytes per scene (pydantic Scene vs SceneRecord vs full store) and JSON throughput"""
+    print(f"resident memory at {args.scenes} scenes")
+    for kind, label in (("pydantic", "pydantic Scene"), ("record", "SceneRecord"), ("store", "StoryStore of records")):
+        # A fresh process per representation keeps the RSS baselines independent
+        with multiprocessing.get_context("fork").Pool(1) as pool:
+            per_scene, held = pool.map(_resident_per_scene, [(kind, args.scenes)])[0]
+        print(f"  {label:<24} {per_scene:8.0f} bytes/scene ({held} held)")
+
+    now = datetime.now().isoformat()
+    texts = [memory_scene_json(n, now) for n in range(args.serialize)]
+    print(f"serialization throughput over {args.serialize} scenes")
+    for label, parse, to_dict in (
+        ("pydantic Scene", backend.Scene.model_validate_json, lambda s: s.model_dump()),
+        ("SceneRecord", backend.SceneRecord.from_json, lambda s: s.to_dict()),
+    ):
+        start = time.perf_counter()
+        scenes = [parse(text) for text in texts]
+        parsed = time.perf_counter() - start
+        start = time.perf_counter()
+        body = json.dumps([to_dict(scene) for scene in scenes])
+        dumped = time.perf_counter() - start
+        print(f"  {label:<24} parse {len(texts) / parsed:10.0f} scenes/s   "
+              f"to JSON {len(texts) / dumped:10.0f} scenes/s ({len(body) // len(texts)} bytes/scene)")
+
+
+async def _overload(args, queue_size):
+    transport = httpx.ASGITransport(app=backend.app)
+    limits = httpx.Limits(max_connections=None)
+    latencies = {"edit": [], "recap": []}
+    statuses = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=None) as client:
+        await client.post("/api/demo/load")
+
+        async def request(n):
+            start = time.perf_counter()
+            if n % 5 == 4:
+                kind = "recap"
+                response = await client.get("/api/characters/char_demo/recap")
+            else:
+                kind = "edit"
+                response = await client.post("/api/edits", json={
+                    "characterId": "char_demo", "sceneId": "scene_demo_4", "command": f"She looks up at the sky ({n})"
+                })
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                latencies[kind].append(time.perf_counter() - start)
+            else:
+                assert response.status_code == 429 and "retry-after" in response.headers, response.text
+
+        # Open loop: arrivals keep coming at the offered rate however slow responses get
+        pending = []
+        started = time.perf_counter()
+        for n in range(int(args.arrival_rate * args.duration)):
+            await asyncio.sleep(max(0.0, started + n / args.arrival_rate - time.perf_counter()))
+            pending.append(asyncio.create_task(request(n)))
+        await asyncio.gather(*pending)
+        elapsed = time.perf_counter() - started
+
+    total = sum(statuses.values())
+    print(f"queue size {queue_size}: {total} requests in {elapsed:.1f}s, "
+          f"{statuses.get(200, 0) / elapsed:.1f} served/s, {statuses.get(429, 0) / total:.0%} answered 429")
+    for kind, samples in latencies.items():
+        if samples:
+            report(f"{kind} (served)", samples)
+
+
+def bench_overload(args):
+    """Open-loop edits and recaps at ~3x model capacity: bounded admission queue vs unbounded"""
+    backend.model_provider = backend.StubProvider(latency=f"fixed:{args.latency}", error_rate=args.error_rate)
+    backend.edit_cache = backend.EditCache(max_entries=0)
+    backend.edit_prefilter = backend.EditPrefilter(mode="off")
+    # Identical stub answers would otherwise let concurrent evolves share one call
+    backend.single_flight_enabled = False
+    capacity = min(args.concurrency / args.latency, args.rate or float("inf"))
+    print(f"offered {args.arrival_rate} req/s (80% edits at 2 model calls, 20% recaps), "
+          f"model capacity {capacity:.0f} calls/s (concurrency {args.concurrency}, quota {args.rate or 'none'}/s), "
+          f"stub error rate {args.error_rate}")
+    for queue_size in (args.queue_size, 10 ** 9):
+        backend.admission = backend.AdmissionController(
+            concurrency=args.concurrency, rate=args.rate, burst=args.rate or 10, queue_size=queue_size
+        )
+        asyncio.run(_overload(args, queue_size))
+
+
+async def _bulk(args):
+    transport = httpx.ASGITransport(app=backend.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        chunks = []
+        async with client.stream("GET", "/api/export") as response:
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+        exported = time.perf_counter() - start
+        body = b"".join(chunks)
+
+        backend.store = backend.SQLiteStoryStore(args.db) if args.db else backend.StoryStore()
+
+        async def upload():
+            for offset in range(0, len(body), 65536):
+                yield body[offset:offset + 65536]
+
+        start = time.perf_counter()
+        response = await client.post("/api/import", content=upload())
+        imported = time.perf_counter() - start
+    return body, exported, response.json(), imported
+
+
+def bench_bulk(args):
+    """NDJSON export of a populated store, then streaming import of it into a fresh store"""
+    backend.store = backend.StoryStore()
+    now = datetime.now().isoformat()
+    for c in range(max(1, args.scenes // args.scenes_per_character)):
+        backend.store.add_character(bench_character(c, now))
+        backend.store.add_scenes(bench_scenes(c, args.scenes_per_character, now))
+    body, exported, summary, imported = asyncio.run(_bulk(args))
+
+    mb = len(body) / 1e6
+    print(f"{summary['scenes']} scenes of {summary['characters']} characters ({mb:.1f} MB NDJSON), "
+          f"import into {'SQLite' if args.db else 'in-memory'} store")
+    print(f"  export   {exported:6.2f}s  {summary['scenes'] / exported:9.0f} scenes/s  {mb / exported:6.1f} MB/s")
+    print(f"  import   {imported:6.2f}s  {summary['scenes'] / imported:9.0f} scenes/s  {mb / imported:6.1f} MB/s")
+    if summary["errorCount"] or summary["scenes"] != args.scenes:
+        print(f"  {summary['errorCount']} invalid lines, e.g. {summary['errors'][:3]}")
+        sys.exit(1)
+
+
+async def _jobs(args, mode):
+    transport = httpx.ASGITransport(app=backend.app)
+    limits = httpx.Limits(max_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits, timeout=None) as client:
+        latencies, job_ids = [], []
+        pending = iter(range(args.characters))
+        started = time.perf_counter()
+
+        async def creator():
+            for _ in pending:
+                start = time.perf_counter()
+                response = await client.post("/api/characters", params={"firstScene": mode}, json=CHARACTER_PAYLOAD)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code in (200, 202), response.text
+                if mode == "defer":
+                    job_ids.append(response.json()["job"]["jobId"])
+
+        await asyncio.gather(*(creator() for _ in range(args.concurrency)))
+        for job_id in job_ids:
+            async for _ in backend.jobs.watch(job_id, poll_seconds=0.05):
+                pass
+            assert backend.store.get_job(job_id).status == "succeeded"
+        return latencies, time.perf_counter() - started
+
+
+def bench_jobs(args):
+    """POST /api/characters latency with the first scene generated inline vs deferred to a background job"""
+    backend.model_provider = backend.StubProvider(latency=f"fixed:{args.latency}")
+    print(f"{args.characters} characters, {args.concurrency} concurrent clients, stub latency {args.latency}s, "
+          f"{backend.job_workers} job workers")
+    for mode in ("generate", "defer"):
+        backend.store = backend.StoryStore()
+        backend.jobs = backend.JobQueue(workers=backend.job_workers)
+        latencies, elapsed = asyncio.run(_jobs(args, mode))
+        report(f"create, firstScene={mode}", latencies)
+        print(f"  {'':<28} all first scenes stored after {elapsed:.2f}s")
+
+
+async def _workers_load(port, duration, connections):
+    # A new connection per request, so consecutive requests land on different workers
+    limits = httpx.Limits(max_keepalive_connections=0)
+    counts = {"requests": 0, "missing": 0, "stale": 0}
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def request(method, url, expect, **kwargs):
+            response = await client.request(method, url, **kwargs)
+            counts["requests"] += 1
+            if response.status_code != expect:
+                counts["stale" if expect == 404 else "missing"] += 1
+            return response
+
+        async def rounds():
+            while time.perf_counter() < deadline:
+                created = await request("POST", "/api/characters", 202, params={"firstScene": "defer"}, json=CHARACTER_PAYLOAD)
+                character_id = created.json()["character"]["id"]
+                for _ in range(3):
+                    await request("GET", f"/api/characters/{character_id}", 200)
+                edit = await request("POST", "/api/edits", 200, json={
+                    "characterId": "char_demo", "sceneId": "scene_demo_4", "command": "She glances at the clock"
+                })
+                scene_id = edit.json()["newScene"]["id"]
+                await request("GET", f"/api/scenes/{scene_id}/lineage", 200, params={"fields": "id"})
+                for _ in range(10):
+                    await request("GET", "/api/scenes/scene_demo_4/lineage", 200)
+                await request("DELETE", f"/api/characters/{character_id}", 200)
+                for _ in range(3):
+                    await request("GET", f"/api/characters/{character_id}", 404)
+
+        await asyncio.gather(*(rounds() for _ in range(connections)))
+    return counts
+
+
+def _workers_client(job):
+    return asyncio.run(_workers_load(*job))
+
+
+def bench_workers(args):
+    """Throughput and cross-worker read correctness of N uvicorn workers sharing one SQLite file"""
+    print(f"{args.clients} client processes x {args.connections} connections for {args.duration}s, "
+          f"{os.cpu_count()} CPUs; every request on a new connection")
+    for workers in args.workers:
+        directory = tempfile.mkdtemp()
+        env = {
+            **os.environ,
+            "CHRONICLE_MODEL_PROVIDER": "stub",
+            "CHRONICLE_DB_PATH": os.path.join(directory, "chronicle.db"),
+            "CHRONICLE_EDIT_CACHE_PATH": os.path.join(directory, "edit-cache.db")
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend:app", "--port", str(args.port), "--workers", str(workers),
+             "--log-level", "warning"],
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            while True:
+                try:
+                    httpx.post(f"http://127.0.0.1:{args.port}/api/demo/load").raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.2)
+            with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+                started = time.perf_counter()
+                results = pool.map(_workers_client, [(args.port, args.duration, args.connections)] * args.clients)
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+        total = {key: sum(r[key] for r in results) for key in results[0]}
+        print(f"  workers={workers}  {total['requests'] / elapsed:8.1f} req/s  "
+              f"{total['missing']} missing reads, {total['stale']} stale reads of {total['requests']} requests")
+
+
+def bench_retrieval(args):
+    """Top-k related-scene retrieval over one long story: index build, query latency, recall vs exact scoring"""
+    rng = random.Random(args.seed)
+    # Zipf-distributed filler words plus a few rare story objects per scene that later edits refer back to
+    vocabulary = [f"word{i}" for i in range(args.vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(args.vocabulary)))
+    objects = [f"object{i}" for i in range(args.scenes // 20)]
+
+    def text(length):
+        return " ".join(rng.choices(vocabulary, cum_weights=cumulative, k=length))
+
+    backend.store = backend.SQLiteStoryStore(args.db) if args.db else backend.StoryStore()
+    now = datetime.now().isoformat()
+    backend.store.add_character(bench_character(0, now))
+    scenes, mentions = [], []
+    for scene in bench_scenes(0, args.scenes, now):
+        mentioned = rng.sample(objects, 2)
+        mentions.append(mentioned)
+        scenes.append(scene.model_copy(update={
+            "sceneDescription": f"{text(30)} {mentioned[0]} {text(10)}",
+            "narrativeSummary": f"{text(8)} {mentioned[1]}"
+        }))
+    backend.store.add_scenes(scenes)
+    retriever = backend.SceneRetriever(top_k=args.k, max_scenes=args.scenes + args.appends)
+    loop = asyncio.new_event_loop()
+
+    async def build():
+        await retriever.related("char_bench_0", "warm up")
+        await retriever._building["char_bench_0"]
+
+    start = time.perf_counter()
+    loop.run_until_complete(build())
+    elapsed = time.perf_counter() - start
+    print(f"{args.scenes} scenes, {'SQLite' if args.db else 'in-memory'} store: "
+          f"index built in {elapsed:.2f}s ({args.scenes / elapsed:,.0f} scenes/s)")
+
+    # An edit that names one object of an earlier scene and reuses a few of its words
+    queries = []
+    for _ in range(args.queries):
+        n = rng.randrange(args.scenes)
+        words = rng.sample(scenes[n].sceneDescription.split(), 4)
+        queries.append((scenes[n].id, f"{text(6)} {' '.join(words)} {rng.choice(mentions[n])} {text(4)}"))
+    index = retriever._indexes["char_bench_0"]
+    exact = backend.SceneIndex(budget=2 ** 32, max_terms=2 ** 32)
+    exact.__dict__.update({key: value for key, value in index.__dict__.items() if key not in ("budget", "max_terms")})
+
+    search, found = [], []
+    for _, query in queries:
+        started = time.perf_counter()
+        found.append([s for s, _ in index.search(query, args.k)])
+        search.append(time.perf_counter() - started)
+    related = []
+    for _, query in queries:
+        started = time.perf_counter()
+        loop.run_until_complete(retriever.related("char_bench_0", query))
+        related.append(time.perf_counter() - started)
+    report(f"index search, top {args.k}", search)
+    report("related() incl. store reads", related)
+
+    overlap, found_target, exact_target = 0, 0, 0
+    for (scene_id, query), approximate in zip(queries, found):
+        best = [s for s, _ in exact.search(query, args.k)]
+        overlap += len(set(best) & set(approximate))
+        found_target += scene_id in approximate
+        exact_target += scene_id in best
+    print(f"  target scene in top {args.k}: {found_target / args.queries:.3f} "
+          f"(exact TF-IDF scoring: {exact_target / args.queries:.3f}), "
+          f"overlap with exact top {args.k}: {overlap / (args.k * args.queries):.3f}")
+
+    added = []
+    for n, scene in enumerate(bench_scenes(1, args.appends, now), start=args.scenes + 1):
+        scene = scene.model_copy(update={
+            "id": f"scene_bench_0_{n}", "characterId": "char_bench_0", "sceneNumber": n,
+            "sceneDescription": text(40), "narrativeSummary": text(10)
+        })
+        backend.store.add_scene(scene)
+        started = time.perf_counter()
+        loop.run_until_complete(retriever.related("char_bench_0", text(10)))
+        added.append(time.perf_counter() - started)
+    report("append scene, then related()", added)
+    loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chronicle benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    storage = subparsers.add_parser("storage", help=bench_storage.__doc__)
+    storage.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    storage.add_argument("--iterations", type=int, default=200)
+    storage.set_defaults(func=bench_storage)
+
+    load = subparsers.add_parser("load", help=bench_load.__doc__)
+    load.add_argument("--latency", type=float, default=0.5, help="stub model latency per call (seconds)")
+    load.add_argument("--clients", type=int, default=200)
+    load.add_argument("--duration", type=float, default=10.0)
+    load.set_defaults(func=bench_load)
+
+    endpoints = subparsers.add_parser("endpoints", help=bench_endpoints.__doc__)
+    endpoints.add_argument("--latency", default="fixed:0", help="stub latency distribution")
+    endpoints.add_argument("--error-rate", type=float, default=0.0)
+    endpoints.add_argument("--seed", type=int, default=0)
+    endpoints.add_argument("--requests", type=int, default=500)
+    endpoints.add_argument("--concurrency", type=int, default=20)
+    endpoints.set_defaults(func=bench_endpoints)
+
+    startup = subparsers.add_parser("startup", help=bench_startup.__doc__)
+    startup.add_argument("--runs", type=int, default=10)
+    startup.set_defaults(func=bench_startup)
+
+    stream = subparsers.add_parser("stream", help=bench_stream.__doc__)
+    stream.add_argument("--latency", type=float, default=0.8, help="stub model latency per call (seconds)")
+    stream.add_argument("--requests", type=int, default=20)
+    stream.add_argument("--port", type=int, default=8765)
+    stream.set_defaults(func=bench_stream)
+
+    engines = subparsers.add_parser("engines", help=bench_engines.__doc__)
+    engines.add_argument("--scenes", type=int, default=20000)
+    engines.set_defaults(func=bench_engines)
+
+    stress = subparsers.add_parser("stress", help=bench_stress.__doc__)
+    stress.add_argument("--edits", type=int, default=5000)
+    stress.add_argument("--db", help="run against a SQLiteStoryStore at this path")
+    stress.add_argument("--processes", type=int, default=4)
+    stress.add_argument("--ids", type=int, default=100000, help="ids generated per process")
+    stress.add_argument("--seed", type=int, default=0)
+    stress.set_defaults(func=bench_stress)
+
+    prefilter = subparsers.add_parser("prefilter", help=bench_prefilter.__doc__)
+    prefilter.add_argument("--latency", type=float, default=0.3, help="stub model latency per call (seconds)")
+    prefilter.add_argument("--rounds", type=int, default=5)
+    prefilter.set_defaults(func=bench_prefilter)
+
+    speculative = subparsers.add_parser("speculative", help=bench_speculative.__doc__)
+    speculative.add_argument("--latency", type=float, default=0.3, help="stub model latency per call (seconds)")
+    speculative.add_argument("--edits", type=int, default=20)
+    speculative.add_argument("--reject-rate", type=float, default=0.2, help="fraction of edits the stub rejects")
+    speculative.set_defaults(func=bench_speculative)
+
+    coalesce = subparsers.add_parser("coalesce", help=bench_coalesce.__doc__)
+    coalesce.add_argument("--requests", type=int, default=200)
+    coalesce.add_argument("--latency", type=float, default=0.2, help="stub model latency per call (seconds)")
+    coalesce.set_defaults(func=bench_coalesce)
+
+    history = subparsers.add_parser("history", help=bench_history.__doc__)
+    history.add_argument("--scenes", type=int, default=10000)
+    history.add_argument("--requests", type=int, default=50)
+    history.add_argument("--db", help="run against a SQLiteStoryStore at this path")
+    history.set_defaults(func=bench_history)
+
+    lineage = subparsers.add_parser("lineage", help=bench_lineage.__doc__)
+    lineage.add_argument("--depth", type=int, default=10000)
+    lineage.add_argument("--fork-every", type=int, default=1000)
+    lineage.add_argument("--requests", type=int, default=20)
+    lineage.add_argument("--db", help="run against a SQLiteStoryStore at this path")
+    lineage.set_defaults(func=bench_lineage)
+
+    memory = subparsers.add_parser("memory", help=bench_memory.__doc__)
+    memory.add_argument("--scenes", type=int, default=1000000)
+    memory.add_argument("--serialize", type=int, default=100000)
+    memory.set_defaults(func=bench_memory)
+
+    overload = subparsers.add_parser("overload", help=bench_overload.__doc__)
+    overload.add_argument("--arrival-rate", type=float, default=60.0, help="offered requests per second")
+    overload.add_argument("--duration", type=float, default=10.0)
+    overload.add_argument("--latency", type=float, default=0.3, help="stub model latency per call (seconds)")
+    overload.add_argument("--concurrency", type=int, default=16)
+    overload.add_argument("--rate", type=float, default=40.0, help="provider quota in calls/s (0 = none)")
+    overload.add_argument("--queue-size", type=int, default=40)
+    overload.add_argument("--error-rate", type=float, default=0.02, help="transient stub failures (retried)")
+    overload.set_defaults(func=bench_overload)
+
+    bulk = subparsers.add_parser("bulk", help=bench_bulk.__doc__)
+    bulk.add_argument("--scenes", type=int, default=100000)
+    bulk.add_argument("--scenes-per-character", type=int, default=1000)
+    bulk.add_argument("--db", help="import into a SQLiteStoryStore at this path")
+    bulk.set_defaults(func=bench_bulk)
+
+    jobs = subparsers.add_parser("jobs", help=bench_jobs.__doc__)
+    jobs.add_argument("--latency", type=float, default=1.0, help="stub model latency per call (seconds)")
+    jobs.add_argument("--characters", type=int, default=50)
+    jobs.add_argument("--concurrency", type=int, default=10)
+    jobs.set_defaults(func=bench_jobs)
+
+    workers = subparsers.add_parser("workers", help=bench_workers.__doc__)
+    workers.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    workers.add_argument("--clients", type=int, default=4, help="load generator processes")
+    workers.add_argument("--connections", type=int, default=8, help="concurrent connections per client process")
+    workers.add_argument("--duration", type=float, default=10.0)
+    workers.add_argument("--port", type=int, default=8766)
+    workers.set_defaults(func=bench_workers)
+
+    retrieval = subparsers.add_parser("retrieval", help=bench_retrieval.__doc__)
+    retrieval.add_argument("--scenes", type=int, default=100000)
+    retrieval.add_argument("--queries", type=int, default=1000)
+    retrieval.add_argument("--appends", type=int, default=200, help="scenes added one at a time after the build")
+    retrieval.add_argument("--vocabulary", type=int, default=20000)
+    retrieval.add_argument("--k", type=int, default=3)
+    retrieval.add_argument("--seed", type=int, default=0)
+    retrieval.add_argument("--db", help="SQLite file (in-memory store when omitted)")
+    retrieval.set_defaults(func=bench_retrieval)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()